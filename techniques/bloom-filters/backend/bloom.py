@@ -1,36 +1,150 @@
-import hashlib
+import math
+import mmap
+import os
+import struct
 import mmh3
-import xxhash
-import fnvhash
+import numpy as np
+
+FILTER_HEADER = struct.Struct("<QI")  # size in bits, hash count
+
+def optimal_size(capacity, fp_rate):
+    """Bits needed to hold `capacity` items at false-positive rate `fp_rate`: m = -n ln p / (ln 2)^2."""
+    return max(8, int(math.ceil(-max(1, capacity) * math.log(fp_rate) / (math.log(2) ** 2))))
+
+def optimal_hash_count(size, capacity):
+    """Hash count minimising the false-positive rate for `capacity` items in `size` bits: k = m/n ln 2."""
+    return max(1, int(round(size / max(1, capacity) * math.log(2))))
 
 class BloomFilter:
-    def __init__(self, size):
+    # Attribute holding the filter's packed state; open() maps it from a file
+    payload = "bit_array"
+    mm = None
+
+    def __init__(self, size, hash_count=4):
         self.size = size
-        self.bit_array = [0] * size
-        # The number of hash functions is determined by the number of functions in _hashes
-        self.hash_count = 4
+        self.hash_count = hash_count
+        # Packed bit array: one bit per slot instead of one Python int
+        self.bit_array = bytearray((size + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity, fp_rate=0.01):
+        """Create a filter sized for `capacity` items at the target false-positive rate."""
+        size = optimal_size(capacity, fp_rate)
+        return cls(size, optimal_hash_count(size, capacity))
+
+    @classmethod
+    def _payload_bytes(cls, size):
+        return (size + 7) // 8
+
+    @classmethod
+    def open(cls, path, size, hash_count=4):
+        """
+        Open the filter stored at `path`, creating it with `size` and `hash_count` if missing.
+
+        The payload is memory-mapped: updates reach the file without an explicit save,
+        and reopening costs no parsing however large the filter is.
+        """
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(FILTER_HEADER.pack(size, hash_count))
+                f.truncate(FILTER_HEADER.size + cls._payload_bytes(size))
+        with open(path, "r+b") as f:
+            mm = mmap.mmap(f.fileno(), 0)
+        bf = cls.__new__(cls)
+        bf.size, bf.hash_count = FILTER_HEADER.unpack_from(mm, 0)
+        bf.mm = mm
+        setattr(bf, cls.payload, memoryview(mm)[FILTER_HEADER.size:])
+        return bf
+
+    def flush(self):
+        if self.mm is not None:
+            self.mm.flush()
+
+    def close(self):
+        """Flush and unmap a filter opened with open(); a no-op for in-memory filters."""
+        if self.mm is not None:
+            getattr(self, self.payload).release()
+            self.mm.close()
+            self.mm = None
+
+    @classmethod
+    def build(cls, items, fp_rate=0.01):
+        """Create a filter sized for and holding `items`."""
+        items = list(items)
+        bf = cls.for_capacity(len(items), fp_rate)
+        bf.add_many(items)
+        return bf
 
     def _hashes(self, item):
-        """Generate hashes for the item using a set of different hash functions."""
-        item_bytes = str(item).encode()
-
-        hashes = [
-            int(hashlib.md5(item_bytes).hexdigest(), 16) % self.size,
-            mmh3.hash(item_bytes, 0) % self.size,  # Seed 0 for murmur3
-            xxhash.xxh32(item_bytes, seed=0).intdigest() % self.size, # Seed 0 for xxhash
-            fnvhash.fnv1_32(item_bytes) % self.size
-        ]
-        return hashes
+        """Derive hash_count indexes from one 128-bit murmur3 hash (double hashing)."""
+        h1, h2 = mmh3.hash64(str(item).encode(), 0, signed=False)
+        # Reducing both halves first gives the same indexes as _hashes_many without big-int math
+        h1, h2 = h1 % self.size, h2 % self.size
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def _hashes_many(self, items):
+        """Return a (len(items), hash_count) array of indexes, row i matching _hashes(items[i])."""
+        pairs = np.array([mmh3.hash64(str(item).encode(), 0, signed=False) for item in items],
+                         dtype=np.uint64).reshape(-1, 2)
+        size = np.uint64(self.size)
+        h1 = pairs[:, :1] % size
+        h2 = pairs[:, 1:] % size
+        return (h1 + np.arange(self.hash_count, dtype=np.uint64) * h2) % size
+
+    def _bits(self):
+        # Writable uint8 view sharing memory with bit_array
+        return np.frombuffer(self.bit_array, dtype=np.uint8)
 
     def add(self, item):
         """Add an item to the Bloom filter and return the hashes."""
         hashes = self._hashes(item)
         for hash_value in hashes:
-            self.bit_array[hash_value] = 1
+            self.bit_array[hash_value >> 3] |= 1 << (hash_value & 7)
         return hashes
 
     def check(self, item):
         """Check if an item is possibly in the Bloom filter and return the hashes."""
         hashes = self._hashes(item)
-        possibly_exists = all(self.bit_array[hash_value] == 1 for hash_value in hashes)
+        possibly_exists = all(self.bit_array[hash_value >> 3] & (1 << (hash_value & 7)) for hash_value in hashes)
         return possibly_exists, hashes
+
+    def add_many(self, items):
+        """Add every item in one vectorized pass and return the (n, hash_count) index array."""
+        hashes = self._hashes_many(items)
+        flat = hashes.ravel()
+        np.bitwise_or.at(self._bits(), (flat >> np.uint64(3)).astype(np.intp),
+                         (np.uint8(1) << (flat & np.uint64(7)).astype(np.uint8)))
+        return hashes
+
+    def check_many(self, items):
+        """Return a boolean array, True where the item is possibly in the filter."""
+        hashes = self._hashes_many(items)
+        bits = self._bits()[(hashes >> np.uint64(3)).astype(np.intp)] >> (hashes & np.uint64(7)).astype(np.uint8)
+        return np.all(bits & 1, axis=1)
+
+    def bits(self):
+        """Return the filter as a list of 0/1 ints, one per slot."""
+        return np.unpackbits(self._bits(), bitorder="little")[:self.size].tolist()
+
+    def bitmap(self):
+        """Return the bits packed eight per byte, least significant bit first."""
+        return bytes(self.bit_array)
+
+    def fill_ratio(self):
+        """Fraction of bits set."""
+        return int(np.unpackbits(self._bits()).sum()) / self.size
+
+    def memory_bytes(self):
+        return len(self.bit_array)
+
+    def to_bytes(self):
+        return FILTER_HEADER.pack(self.size, self.hash_count) + bytes(self.bit_array)
+
+    @classmethod
+    def from_bytes(cls, buf):
+        size, hash_count = FILTER_HEADER.unpack_from(buf, 0)
+        bf = cls.__new__(cls)
+        bf.size = size
+        bf.hash_count = hash_count
+        bf.bit_array = bytearray(buf[FILTER_HEADER.size:])
+        return bf
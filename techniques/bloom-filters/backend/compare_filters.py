@@ -0,0 +1,55 @@
+import argparse
+import time
+
+from bloom import BloomFilter
+from cuckoo import CuckooFilter
+from xor_filter import XorFilter
+
+FILTERS = {"bloom": BloomFilter, "cuckoo": CuckooFilter, "xor": XorFilter}
+
+def measure(cls, keys, negatives, fp_rate, lookups):
+    """Build one filter and return its row of the comparison table."""
+    start = time.perf_counter()
+    f = cls.build(keys, fp_rate)
+    build_seconds = time.perf_counter() - start
+
+    probe = negatives[:lookups]
+    start = time.perf_counter_ns()
+    for item in probe:
+        f.check(item)
+    lookup_ns = (time.perf_counter_ns() - start) / len(probe)
+
+    start = time.perf_counter_ns()
+    measured = f.check_many(negatives).mean()
+    batched_ns = (time.perf_counter_ns() - start) / len(negatives)
+
+    return {
+        "bits_per_key": f.memory_bytes() * 8 / len(keys),
+        "measured_fp_rate": measured,
+        "build_ms": build_seconds * 1000,
+        "lookup_ns": lookup_ns,
+        "batched_lookup_ns": batched_ns,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Bloom, cuckoo and xor filters at equal target false-positive rates.")
+    parser.add_argument("--keys", type=int, default=100000, help="keys inserted into each filter")
+    parser.add_argument("--negatives", type=int, default=200000, help="absent keys checked to measure the false-positive rate")
+    parser.add_argument("--lookups", type=int, default=20000, help="single-item lookups timed per filter")
+    parser.add_argument("--fp-rates", type=float, nargs="+", default=[0.01, 0.001])
+    parser.add_argument("--filters", nargs="+", choices=list(FILTERS), default=list(FILTERS))
+    args = parser.parse_args()
+
+    keys = [f"key-{i}" for i in range(args.keys)]
+    negatives = [f"absent-{i}" for i in range(args.negatives)]
+
+    print(f"{'filter':<8} {'target fp':>9} {'measured fp':>11} {'bits/key':>8} {'build ms':>9} "
+          f"{'lookup ns':>10} {'batched ns':>10}")
+    for fp_rate in args.fp_rates:
+        for name in args.filters:
+            row = measure(FILTERS[name], keys, negatives, fp_rate, args.lookups)
+            print(f"{name:<8} {fp_rate:>9.4f} {row['measured_fp_rate']:>11.5f} {row['bits_per_key']:>8.2f} "
+                  f"{row['build_ms']:>9.0f} {row['lookup_ns']:>10.0f} {row['batched_lookup_ns']:>10.0f}")
+
+if __name__ == "__main__":
+    main()
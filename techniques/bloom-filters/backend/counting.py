@@ -0,0 +1,111 @@
+import numpy as np
+from bloom import BloomFilter, FILTER_HEADER
+
+COUNTER_MAX = 15  # 4-bit counters
+
+class CountingBloomFilter(BloomFilter):
+    """
+    Bloom filter with a 4-bit counter per slot instead of a bit, so items can be removed.
+
+    Two counters are packed per byte. A counter that reaches 15 sticks there:
+    decrementing it could create false negatives, so it is never decremented.
+    """
+    payload = "counters"
+
+    def __init__(self, size, hash_count=4):
+        self.size = size
+        self.hash_count = hash_count
+        self.counters = bytearray((size + 1) // 2)
+
+    @classmethod
+    def _payload_bytes(cls, size):
+        return (size + 1) // 2
+
+    def _counter(self, index):
+        return (self.counters[index >> 1] >> ((index & 1) << 2)) & 0xF
+
+    def _set_counter(self, index, value):
+        shift = (index & 1) << 2
+        self.counters[index >> 1] = (self.counters[index >> 1] & ~(0xF << shift) & 0xFF) | (value << shift)
+
+    def add(self, item):
+        """Add an item to the filter and return the hashes."""
+        hashes = self._hashes(item)
+        for hash_value in hashes:
+            count = self._counter(hash_value)
+            if count < COUNTER_MAX:
+                self._set_counter(hash_value, count + 1)
+        return hashes
+
+    def check(self, item):
+        """Check if an item is possibly in the filter and return the hashes."""
+        hashes = self._hashes(item)
+        return all(self._counter(hash_value) for hash_value in hashes), hashes
+
+    def remove(self, item):
+        """
+        Remove an item that was added before and return (removed, hashes).
+
+        Items that are definitely absent are left alone. Removing an item that was
+        never added (a false positive) can cause false negatives for other items.
+        """
+        hashes = self._hashes(item)
+        if not all(self._counter(hash_value) for hash_value in hashes):
+            return False, hashes
+        for hash_value in hashes:
+            count = self._counter(hash_value)
+            if count < COUNTER_MAX:
+                self._set_counter(hash_value, count - 1)
+        return True, hashes
+
+    def _unpacked(self):
+        packed = np.frombuffer(self.counters, dtype=np.uint8)
+        counters = np.empty(len(packed) * 2, dtype=np.uint8)
+        counters[0::2] = packed & 0xF
+        counters[1::2] = packed >> 4
+        return counters[:self.size]
+
+    def _pack(self, counters):
+        padded = np.zeros(len(self.counters) * 2, dtype=np.uint8)
+        padded[:self.size] = counters
+        self.counters[:] = (padded[0::2] | (padded[1::2] << 4)).tobytes()
+
+    def add_many(self, items):
+        """Add every item in one vectorized pass and return the (n, hash_count) index array."""
+        hashes = self._hashes_many(items)
+        counters = self._unpacked().astype(np.int64)
+        np.add.at(counters, hashes.ravel().astype(np.intp), 1)
+        self._pack(np.minimum(counters, COUNTER_MAX))
+        return hashes
+
+    def check_many(self, items):
+        """Return a boolean array, True where the item is possibly in the filter."""
+        hashes = self._hashes_many(items)
+        return np.all(self._unpacked()[hashes.astype(np.intp)] > 0, axis=1)
+
+    def bits(self):
+        """Return a list of 0/1 ints, 1 where the slot's counter is non-zero."""
+        return (self._unpacked() > 0).astype(np.uint8).tolist()
+
+    def bitmap(self):
+        """Return the non-zero counters as bits packed eight per byte, least significant bit first."""
+        return np.packbits(self._unpacked() > 0, bitorder="little").tobytes()
+
+    def fill_ratio(self):
+        """Fraction of slots with a non-zero counter."""
+        return int(np.count_nonzero(self._unpacked())) / self.size
+
+    def memory_bytes(self):
+        return len(self.counters)
+
+    def to_bytes(self):
+        return FILTER_HEADER.pack(self.size, self.hash_count) + bytes(self.counters)
+
+    @classmethod
+    def from_bytes(cls, buf):
+        size, hash_count = FILTER_HEADER.unpack_from(buf, 0)
+        cbf = cls.__new__(cls)
+        cbf.size = size
+        cbf.hash_count = hash_count
+        cbf.counters = bytearray(buf[FILTER_HEADER.size:])
+        return cbf
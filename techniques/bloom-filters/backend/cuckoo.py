@@ -0,0 +1,178 @@
+import math
+import random
+import struct
+import mmh3
+import numpy as np
+from packed import PackedArray
+
+BUCKET_SIZE = 4      # fingerprints per bucket
+LOAD_FACTOR = 0.95   # achievable occupancy with 4-way buckets
+MAX_KICKS = 500
+MAX_GROWS = 32       # times build() enlarges the table (by 10% each) before giving up
+CUCKOO_HEADER = struct.Struct("<QIIqI")  # buckets, fingerprint bits, count, victim bucket (-1: none), victim fingerprint
+
+def _mix(fingerprint):
+    return (fingerprint * 0x5BD1E995) & 0xFFFFFFFF
+
+class CuckooFilter:
+    """
+    Cuckoo filter (Fan et al., 2014): a table of buckets holding 4 small fingerprints.
+
+    Each item has two candidate buckets, i1 and i2 = (mix(fp) - i1) mod buckets, so
+    either one can be computed from the other and the fingerprint alone. A lookup
+    reads just those two buckets, and deletes remove one copy of the fingerprint.
+    Fingerprint 0 marks an empty slot.
+    """
+
+    def __init__(self, num_buckets, fingerprint_bits=12):
+        self.num_buckets = num_buckets
+        self.fingerprint_bits = fingerprint_bits
+        self.table = PackedArray(num_buckets * BUCKET_SIZE, fingerprint_bits)
+        self.count = 0
+        # A fingerprint evicted by the last, failed insertion; the filter is full once it is set
+        self.victim = None
+        self.rng = random.Random(0)
+
+    @classmethod
+    def for_capacity(cls, capacity, fp_rate=0.01):
+        """Create a filter for `capacity` items; a lookup compares 2 * 4 fingerprints, so f = log2(8 / fp_rate)."""
+        fingerprint_bits = min(32, max(4, int(math.ceil(math.log2(2 * BUCKET_SIZE / fp_rate)))))
+        num_buckets = max(1, int(math.ceil(max(1, capacity) / (BUCKET_SIZE * LOAD_FACTOR))))
+        return cls(num_buckets, fingerprint_bits)
+
+    @classmethod
+    def build(cls, items, fp_rate=0.01):
+        """Create a filter holding `items`, growing the table if an insertion runs out of kicks."""
+        # A key added more than 2 * BUCKET_SIZE times can never fit, however large the table
+        items = list(dict.fromkeys(str(item) for item in items))
+        capacity = len(items)
+        for _ in range(MAX_GROWS):
+            cf = cls.for_capacity(capacity, fp_rate)
+            try:
+                cf.add_many(items)
+                return cf
+            except ValueError:
+                capacity = int(capacity * 1.1) + 1
+        raise ValueError(f"could not build cuckoo filter for {len(items)} items in {MAX_GROWS} attempts")
+
+    def _locate(self, item):
+        h1, h2 = mmh3.hash64(str(item).encode(), 0, signed=False)
+        fingerprint = h2 % ((1 << self.fingerprint_bits) - 1) + 1
+        i1 = h1 % self.num_buckets
+        return fingerprint, i1, self._alt(i1, fingerprint)
+
+    def _alt(self, bucket, fingerprint):
+        return (_mix(fingerprint) - bucket) % self.num_buckets
+
+    def _insert_into(self, bucket, fingerprint):
+        empty = self._find(bucket, 0)
+        if empty is None:
+            return False
+        self.table.set(empty, fingerprint)
+        return True
+
+    def _find(self, bucket, fingerprint):
+        fingerprints = self.table.get_range(bucket * BUCKET_SIZE, BUCKET_SIZE)
+        if fingerprint in fingerprints:
+            return bucket * BUCKET_SIZE + fingerprints.index(fingerprint)
+        return None
+
+    def add(self, item):
+        """Add an item and return its two candidate buckets; raises ValueError when the filter is full."""
+        if self.victim is not None:
+            raise ValueError("cuckoo filter is full")
+        fingerprint, i1, i2 = self._locate(item)
+        self.count += 1
+        if self._insert_into(i1, fingerprint) or self._insert_into(i2, fingerprint):
+            return [i1, i2]
+        # Both buckets are full: evict random fingerprints along a path until one finds room
+        bucket = self.rng.choice((i1, i2))
+        for _ in range(MAX_KICKS):
+            slot = bucket * BUCKET_SIZE + self.rng.randrange(BUCKET_SIZE)
+            evicted = self.table.get(slot)
+            self.table.set(slot, fingerprint)
+            fingerprint = evicted
+            bucket = self._alt(bucket, fingerprint)
+            if self._insert_into(bucket, fingerprint):
+                return [i1, i2]
+        self.victim = (bucket, fingerprint)
+        raise ValueError("cuckoo filter is full")
+
+    def check(self, item):
+        """Check if an item is possibly in the filter and return its two candidate buckets."""
+        fingerprint, i1, i2 = self._locate(item)
+        found = (self._find(i1, fingerprint) is not None or self._find(i2, fingerprint) is not None
+                 or self.victim in ((i1, fingerprint), (i2, fingerprint)))
+        return found, [i1, i2]
+
+    def remove(self, item):
+        """Remove one copy of an added item and return (removed, buckets)."""
+        fingerprint, i1, i2 = self._locate(item)
+        if self.victim in ((i1, fingerprint), (i2, fingerprint)):
+            self.victim = None
+            self.count -= 1
+            return True, [i1, i2]
+        for bucket in (i1, i2):
+            slot = self._find(bucket, fingerprint)
+            if slot is not None:
+                self.table.set(slot, 0)
+                self.count -= 1
+                if self.victim is not None:
+                    # Freed a slot: give the evicted fingerprint another chance
+                    victim_bucket, victim_fingerprint = self.victim
+                    self.victim = None
+                    self.count -= 1
+                    self._reinsert(victim_bucket, victim_fingerprint)
+                return True, [i1, i2]
+        return False, [i1, i2]
+
+    def _reinsert(self, bucket, fingerprint):
+        self.count += 1
+        if not (self._insert_into(bucket, fingerprint) or self._insert_into(self._alt(bucket, fingerprint), fingerprint)):
+            self.victim = (bucket, fingerprint)
+
+    def add_many(self, items):
+        """Add items one by one (insertion is inherently sequential); returns the (n, 2) bucket array."""
+        return np.array([self.add(item) for item in items], dtype=np.uint64).reshape(-1, 2)
+
+    def check_many(self, items):
+        """Return a boolean array, True where the item is possibly in the filter."""
+        pairs = np.array([mmh3.hash64(str(item).encode(), 0, signed=False) for item in items],
+                         dtype=np.uint64).reshape(-1, 2)
+        n = np.uint64(self.num_buckets)
+        fingerprints = pairs[:, 1] % np.uint64((1 << self.fingerprint_bits) - 1) + np.uint64(1)
+        i1 = pairs[:, 0] % n
+        i2 = ((fingerprints * np.uint64(0x5BD1E995)) & np.uint64(0xFFFFFFFF)) % n
+        i2 = (i2 + n - i1) % n
+        slots = np.arange(BUCKET_SIZE, dtype=np.uint64)
+        candidates = np.concatenate([i1[:, None] * np.uint64(BUCKET_SIZE) + slots,
+                                     i2[:, None] * np.uint64(BUCKET_SIZE) + slots], axis=1)
+        found = np.any(self.table.get_many(candidates) == fingerprints[:, None], axis=1)
+        if self.victim is not None:
+            victim_bucket, victim_fingerprint = self.victim
+            found |= (fingerprints == victim_fingerprint) & ((i1 == victim_bucket) | (i2 == victim_bucket))
+        return found
+
+    def fill_ratio(self):
+        """Fraction of fingerprint slots in use."""
+        return self.count / (self.num_buckets * BUCKET_SIZE)
+
+    def memory_bytes(self):
+        return self.table.memory_bytes()
+
+    def to_bytes(self):
+        victim_bucket, victim_fingerprint = self.victim if self.victim is not None else (-1, 0)
+        header = CUCKOO_HEADER.pack(self.num_buckets, self.fingerprint_bits, self.count, victim_bucket, victim_fingerprint)
+        return header + bytes(self.table.buf)
+
+    @classmethod
+    def from_bytes(cls, buf):
+        num_buckets, fingerprint_bits, count, victim_bucket, victim_fingerprint = CUCKOO_HEADER.unpack_from(buf, 0)
+        cf = cls.__new__(cls)
+        cf.num_buckets = num_buckets
+        cf.fingerprint_bits = fingerprint_bits
+        cf.table = PackedArray(num_buckets * BUCKET_SIZE, fingerprint_bits, buf[CUCKOO_HEADER.size:])
+        cf.count = count
+        cf.victim = (victim_bucket, victim_fingerprint) if victim_bucket >= 0 else None
+        cf.rng = random.Random(0)
+        return cf
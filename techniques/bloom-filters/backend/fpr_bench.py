@@ -0,0 +1,89 @@
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bloom import BloomFilter, optimal_size, optimal_hash_count
+
+def theoretical_fp_rate(size, hash_count, inserted):
+    """Expected false-positive rate of an m-bit, k-hash filter holding n items: (1 - e^(-kn/m))^k."""
+    return (1 - math.exp(-hash_count * inserted / size)) ** hash_count
+
+def keys(prefix, start, stop):
+    return [f"{prefix}{i}" for i in range(start, stop)]
+
+def run_point(point):
+    """Fill one filter and probe it with absent keys; returns the measurements for one sweep point."""
+    size, hash_count, inserts, probes, chunk = point
+    bf = BloomFilter(size, hash_count)
+
+    # Keys are generated and hashed in chunks so millions of them never sit in memory at once
+    insert_seconds = 0.0
+    for start in range(0, inserts, chunk):
+        batch = keys("k", start, min(start + chunk, inserts))
+        t0 = time.perf_counter()
+        bf.add_many(batch)
+        insert_seconds += time.perf_counter() - t0
+
+    lookup_seconds = 0.0
+    false_positives = 0
+    for start in range(0, probes, chunk):
+        batch = keys("absent", start, min(start + chunk, probes))
+        t0 = time.perf_counter()
+        false_positives += int(bf.check_many(batch).sum())
+        lookup_seconds += time.perf_counter() - t0
+
+    return {
+        "size": size,
+        "hash_count": hash_count,
+        "inserts": inserts,
+        "theoretical_fp_rate": theoretical_fp_rate(size, hash_count, inserts),
+        "measured_fp_rate": false_positives / probes if probes else 0.0,
+        "inserts_per_sec": inserts / insert_seconds if insert_seconds else 0.0,
+        "lookups_per_sec": probes / lookup_seconds if lookup_seconds else 0.0,
+        "bits_per_key": bf.memory_bytes() * 8 / inserts if inserts else 0.0,
+        "fill_ratio": bf.fill_ratio(),
+    }
+
+def sweep_points(args):
+    """Every (size, hash count, inserts) combination to measure, in print order."""
+    points = []
+    for inserts in args.inserts:
+        # Optimally sized filters for each target rate...
+        for fp_rate in args.fp_rates:
+            size = optimal_size(inserts, fp_rate)
+            points.append((size, optimal_hash_count(size, inserts), inserts))
+        # ...and an explicit grid of sizes and hash counts
+        for size in args.sizes:
+            for hash_count in args.hash_counts or [optimal_hash_count(size, inserts)]:
+                points.append((size, hash_count, inserts))
+    return [(size, hash_count, inserts, args.probes, args.chunk) for size, hash_count, inserts in points]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Bloom filter false-positive rates and throughput across a sweep.")
+    parser.add_argument("--inserts", type=int, nargs="+", default=[1000000], help="items added to each filter")
+    parser.add_argument("--fp-rates", type=float, nargs="*", default=[0.01, 0.001],
+                        help="target rates; each adds an optimally sized filter to the sweep")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[], help="filter sizes in bits to sweep")
+    parser.add_argument("--hash-counts", type=int, nargs="*", default=[],
+                        help="hash counts to sweep with --sizes (default: optimal for each size)")
+    parser.add_argument("--probes", type=int, default=1000000, help="absent keys checked per filter")
+    parser.add_argument("--chunk", type=int, default=100000, help="keys per add_many/check_many batch")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes running sweep points")
+    args = parser.parse_args()
+
+    points = sweep_points(args)
+    if not points:
+        parser.error("nothing to run: pass --fp-rates or --sizes")
+
+    print(f"{'bits':>12} {'k':>3} {'inserts':>10} {'theory fp':>10} {'measured fp':>11} {'fill':>6} "
+          f"{'bits/key':>8} {'inserts/s':>11} {'lookups/s':>11}")
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for row in pool.map(run_point, points):
+            print(f"{row['size']:>12,} {row['hash_count']:>3} {row['inserts']:>10,} "
+                  f"{row['theoretical_fp_rate']:>10.5f} {row['measured_fp_rate']:>11.5f} {row['fill_ratio']:>6.3f} "
+                  f"{row['bits_per_key']:>8.2f} {row['inserts_per_sec']:>11,.0f} {row['lookups_per_sec']:>11,.0f}")
+
+if __name__ == "__main__":
+    main()
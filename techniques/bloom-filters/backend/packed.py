@@ -0,0 +1,59 @@
+import numpy as np
+
+class PackedArray:
+    """Fixed-length array of `width`-bit unsigned ints (width <= 32) packed back to back in a bytearray."""
+
+    def __init__(self, length, width, buf=None):
+        self.length = length
+        self.width = width
+        self.mask = (1 << width) - 1
+        # 8 bytes of padding so every slot can be read as one little-endian 64-bit word
+        self.buf = bytearray((length * width + 7) // 8 + 8) if buf is None else bytearray(buf)
+
+    def __len__(self):
+        return self.length
+
+    def get(self, i):
+        bit = i * self.width
+        byte = bit >> 3
+        return (int.from_bytes(self.buf[byte:byte + 8], "little") >> (bit & 7)) & self.mask
+
+    def get_range(self, start, count):
+        """Return the `count` values from slot `start` on, decoded from one read."""
+        bit = start * self.width
+        byte = bit >> 3
+        end = (bit + count * self.width + 7) >> 3
+        word = int.from_bytes(self.buf[byte:end], "little") >> (bit & 7)
+        return [(word >> (j * self.width)) & self.mask for j in range(count)]
+
+    def set(self, i, value):
+        bit = i * self.width
+        byte = bit >> 3
+        shift = bit & 7
+        word = int.from_bytes(self.buf[byte:byte + 8], "little")
+        word = (word & ~(self.mask << shift)) | ((value & self.mask) << shift)
+        self.buf[byte:byte + 8] = word.to_bytes(8, "little")
+
+    def _words(self, indexes):
+        bits = indexes.astype(np.uint64) * np.uint64(self.width)
+        data = np.frombuffer(self.buf, dtype=np.uint8)
+        start = (bits >> np.uint64(3)).astype(np.intp)
+        words = np.zeros(indexes.shape, dtype=np.uint64)
+        for j in range(8):
+            words |= data[start + j].astype(np.uint64) << np.uint64(8 * j)
+        return words, bits & np.uint64(7)
+
+    def get_many(self, indexes):
+        """Return the values at an array of indexes as a uint64 array of the same shape."""
+        words, shifts = self._words(np.asarray(indexes))
+        return (words >> shifts) & np.uint64(self.mask)
+
+    def set_all(self, values):
+        """Overwrite every slot from a sequence of `length` values."""
+        values = np.asarray(values, dtype=np.uint64).reshape(-1, 1)
+        bits = ((values >> np.arange(self.width, dtype=np.uint64)) & np.uint64(1)).astype(np.uint8)
+        packed = np.packbits(bits.ravel(), bitorder="little")
+        self.buf = bytearray(packed.tobytes()) + bytearray(len(self.buf) - len(packed))
+
+    def memory_bytes(self):
+        return len(self.buf)
@@ -0,0 +1,104 @@
+import numpy as np
+from bloom import BloomFilter
+
+class ScalableBloomFilter:
+    """
+    Bloom filter that grows without a fixed capacity (Almeida et al., 2007).
+
+    Items go into the newest slice; once it holds its capacity a new slice
+    `growth` times larger is added. Slice i targets fp_rate * (1 - r) * r^i, so
+    the compound false-positive rate stays below fp_rate however many slices there are.
+    """
+
+    def __init__(self, initial_capacity=100, fp_rate=0.01, growth=2, tightening=0.5):
+        self.initial_capacity = initial_capacity
+        self.fp_rate = fp_rate
+        self.growth = growth
+        self.tightening = tightening
+        self.slices = []      # BloomFilters, oldest first
+        self.capacities = []  # items each slice was sized for
+        self.count = 0        # items in the newest slice
+        self._add_slice()
+
+    def _add_slice(self):
+        i = len(self.slices)
+        capacity = self.initial_capacity * self.growth ** i
+        fp_rate = self.fp_rate * (1 - self.tightening) * self.tightening ** i
+        self.slices.append(BloomFilter.for_capacity(capacity, fp_rate))
+        self.capacities.append(capacity)
+        self.count = 0
+
+    @property
+    def size(self):
+        return sum(bf.size for bf in self.slices)
+
+    @property
+    def hash_count(self):
+        return self.slices[-1].hash_count
+
+    def _offset(self, index):
+        # Position of slice `index` in the concatenated bit array reported by bits()
+        return sum(bf.size for bf in self.slices[:index])
+
+    def add(self, item):
+        """Add an item to the newest slice and return its hashes as positions in bits()."""
+        possibly_exists, hashes = self.check(item)
+        if possibly_exists:
+            # Already (probably) present: adding again would only fill the slice faster
+            return hashes
+        if self.count >= self.capacities[-1]:
+            self._add_slice()
+        self.count += 1
+        offset = self._offset(len(self.slices) - 1)
+        return [offset + h for h in self.slices[-1].add(item)]
+
+    def check(self, item):
+        """Check every slice, newest first; returns the hashes of the matching (or newest) slice."""
+        newest = None
+        for index in range(len(self.slices) - 1, -1, -1):
+            possibly_exists, hashes = self.slices[index].check(item)
+            hashes = [self._offset(index) + h for h in hashes]
+            if possibly_exists:
+                return True, hashes
+            if newest is None:
+                newest = hashes
+        return False, newest
+
+    def add_many(self, items):
+        """Add items in bulk, filling the newest slice before growing."""
+        # Like add(), count only new items: repeats within the batch (hashed as str, so
+        # dedupe on that) and items already (probably) present don't take up slice room
+        items = list(dict.fromkeys(str(item) for item in items))
+        items = [item for item, present in zip(items, self.check_many(items)) if not present]
+        while items:
+            room = self.capacities[-1] - self.count
+            if room <= 0:
+                self._add_slice()
+                continue
+            self.slices[-1].add_many(items[:room])
+            self.count += min(room, len(items))
+            items = items[room:]
+
+    def check_many(self, items):
+        """Return a boolean array, True where the item is possibly in any slice."""
+        result = np.zeros(len(items), dtype=bool)
+        for bf in self.slices:
+            result |= bf.check_many(items)
+        return result
+
+    def bits(self):
+        return [bit for bf in self.slices for bit in bf.bits()]
+
+    def bitmap(self):
+        """Return bits() packed eight per byte, least significant bit first."""
+        return np.packbits(np.array(self.bits(), dtype=np.uint8), bitorder="little").tobytes()
+
+    def close(self):
+        pass
+
+    def fill_ratio(self):
+        """Fraction of bits set across all slices."""
+        return sum(bf.fill_ratio() * bf.size for bf in self.slices) / self.size
+
+    def memory_bytes(self):
+        return sum(bf.memory_bytes() for bf in self.slices)
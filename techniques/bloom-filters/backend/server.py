@@ -1,7 +1,17 @@
-from fastapi import FastAPI, HTTPException
+import base64
+import json
+import os
+import threading
+from collections import deque
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 from bloom import BloomFilter
+from counting import CountingBloomFilter
+from scalable import ScalableBloomFilter
 
 app = FastAPI()
 
@@ -17,15 +27,42 @@ app.add_middleware(
 class Item(BaseModel):
     item: str
 
+# Directory holding the memory-mapped filter files, one per filter type
+DATA_DIR = os.environ.get("BLOOM_DATA_DIR", ".")
+# Most recent additions kept for /history; 0 disables it
+HISTORY_SIZE = int(os.environ.get("BLOOM_HISTORY_SIZE", "100"))
+# Items hashed per add_many/check_many call in the bulk endpoints
+BULK_CHUNK_SIZE = 10000
+
+# Filter variants the server can run; pick one with BLOOM_FILTER_TYPE or /reset?filter_type=...
+# Standard and counting filters persist to a memory-mapped file; scalable ones live in memory.
+FILTER_TYPES = {
+    "standard": lambda path: BloomFilter.open(path, size=100),
+    "counting": lambda path: CountingBloomFilter.open(path, size=100),
+    "scalable": lambda path: ScalableBloomFilter(initial_capacity=10, fp_rate=0.1),
+}
+
+def create_filter(filter_type, reset=False):
+    if filter_type not in FILTER_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown filter type '{filter_type}'. Choose one of {list(FILTER_TYPES)}.")
+    path = os.path.join(DATA_DIR, f"{filter_type}.filter")
+    if reset and os.path.exists(path):
+        os.remove(path)
+    return FILTER_TYPES[filter_type](path)
+
 # Initialize Bloom Filter and history
-bloom_filter = BloomFilter(size=100)
-history = []
+current_filter_type = os.environ.get("BLOOM_FILTER_TYPE", "standard")
+bloom_filter = create_filter(current_filter_type)
+history = deque(maxlen=HISTORY_SIZE)
+# Serializes updates; bulk requests run in worker threads alongside single-item ones
+filter_lock = threading.Lock()
 
 @app.post("/add")
 def add_item(item: Item):
     """Adds an item to the bloom filter, stores it in history, and returns the generated hashes."""
-    hashes = bloom_filter.add(item.item)
-    history.append({"item": item.item, "hashes": hashes})
+    with filter_lock:
+        hashes = bloom_filter.add(item.item)
+        history.append({"item": item.item, "hashes": hashes})
     return {"message": f"'{item.item}' added to the bloom filter.", "hashes": hashes}
 
 @app.post("/check")
@@ -34,20 +71,120 @@ def check_item(item: Item):
     possibly_exists, hashes = bloom_filter.check(item.item)
     return {"item": item.item, "possibly_exists": possibly_exists, "hashes": hashes}
 
+def parse_item(line, line_number):
+    try:
+        return str(json.loads(line)["item"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail=f"Invalid item on line {line_number}.")
+
+async def read_item_chunks(request):
+    """Yield lists of up to BULK_CHUNK_SIZE items from a streamed NDJSON body of {"item": ...} lines."""
+    buffer = b""
+    chunk = []
+    line_number = 0
+    async for data in request.stream():
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                chunk.append(parse_item(line, line_number))
+            if len(chunk) >= BULK_CHUNK_SIZE:
+                yield chunk
+                chunk = []
+    if buffer.strip():
+        chunk.append(parse_item(buffer, line_number + 1))
+    if chunk:
+        yield chunk
+
+def add_chunk(items):
+    with filter_lock:
+        bloom_filter.add_many(items)
+        # Only the newest items can survive in the bounded history, so only they are re-hashed
+        for item in items[len(items) - history.maxlen:] if history.maxlen else []:
+            history.append({"item": item, "hashes": bloom_filter.check(item)[1]})
+
+@app.post("/add/bulk")
+async def add_items(request: Request):
+    """Adds every item of a streamed NDJSON body of {"item": ...} lines, hashing them in batches."""
+    added = 0
+    try:
+        async for chunk in read_item_chunks(request):
+            await run_in_threadpool(add_chunk, chunk)
+            added += len(chunk)
+    except HTTPException as e:
+        e.detail = f"{e.detail} {added} items were added before it."
+        raise
+    return {"message": f"{added} items added to the bloom filter.", "added": added}
+
+@app.post("/check/bulk")
+async def check_items(request: Request):
+    """
+    Checks every item of a streamed NDJSON body of {"item": ...} lines, hashing them in
+    batches, and streams back one {"item", "possibly_exists"} NDJSON line per item, in order.
+    Each batch's results are sent as soon as it is checked, while the rest of the body is
+    still being read. An invalid line in the first batch is a 400; once results have been
+    sent, it ends the stream with an {"error": ...} line instead.
+    """
+    chunks = read_item_chunks(request)
+    first = await anext(chunks, None)
+
+    async def lines():
+        chunk = first
+        try:
+            while chunk is not None:
+                found = await run_in_threadpool(bloom_filter.check_many, chunk)
+                yield "".join(json.dumps({"item": item, "possibly_exists": bool(hit)}) + "\n"
+                              for item, hit in zip(chunk, found))
+                chunk = await anext(chunks, None)
+        except HTTPException as e:
+            yield json.dumps({"error": e.detail}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.post("/remove")
+def remove_item(item: Item):
+    """Removes an item from a counting bloom filter and returns the generated hashes."""
+    global history
+    if not hasattr(bloom_filter, "remove"):
+        raise HTTPException(status_code=400, detail=f"The '{current_filter_type}' filter does not support removal.")
+    with filter_lock:
+        removed, hashes = bloom_filter.remove(item.item)
+        if removed:
+            history = deque((entry for entry in history if entry["item"] != item.item), maxlen=HISTORY_SIZE)
+    return {"item": item.item, "removed": removed, "hashes": hashes}
+
 @app.get("/status")
 def get_status():
     """Returns the current state of the bloom filter."""
-    return {"bit_array": bloom_filter.bit_array, "hash_count": bloom_filter.hash_count}
+    return {
+        "filter_type": current_filter_type,
+        # Packed bits, least significant bit first, base64-encoded
+        "bitmap": base64.b64encode(bloom_filter.bitmap()).decode("ascii"),
+        "hash_count": bloom_filter.hash_count,
+        "size": bloom_filter.size,
+        "memory_bytes": bloom_filter.memory_bytes(),
+        "fill_ratio": round(bloom_filter.fill_ratio(), 4),
+    }
+
+@app.get("/bitmap")
+def get_bitmap():
+    """Returns the packed bits as raw bytes, least significant bit first."""
+    return Response(bloom_filter.bitmap(), media_type="application/octet-stream")
 
 @app.get("/history")
 def get_history():
-    """Returns the history of added items."""
-    return {"history": history}
+    """Returns the most recently added items, oldest first."""
+    return {"history": list(history), "max_size": HISTORY_SIZE}
 
 @app.post("/reset")
-def reset_filter():
-    """Resets the bloom filter and history to their initial empty state."""
-    global bloom_filter, history
-    bloom_filter = BloomFilter(size=100)
-    history = []
-    return {"message": "Bloom filter and history have been reset."}
+def reset_filter(filter_type: Optional[str] = None):
+    """Resets the bloom filter and history to their initial empty state, optionally switching the filter type."""
+    global bloom_filter, history, current_filter_type
+    with filter_lock:
+        new_filter = create_filter(filter_type or current_filter_type, reset=True)
+        bloom_filter.close()
+        bloom_filter = new_filter
+        current_filter_type = filter_type or current_filter_type
+        history = deque(maxlen=HISTORY_SIZE)
+    return {"message": "Bloom filter and history have been reset.", "filter_type": current_filter_type}
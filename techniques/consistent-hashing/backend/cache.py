@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import OrderedDict
+
+class RoutingCache:
+    """
+    Bounded LRU cache of key -> node, with an optional time-to-live per entry. Entries
+    belong to one ring version: the first lookup made with a newer version empties the
+    cache, so a membership change never serves a stale route.
+    """
+
+    def __init__(self, max_size=100000, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl            # seconds, or None to keep entries until evicted
+        self.version = -1
+        self.entries = OrderedDict()  # key -> (node, expiry time or None), least recently used first
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        """Return the cached node for `key` under ring `version`, or None on a miss."""
+        if version != self.version:
+            with self._lock:
+                if version > self.version:
+                    self.entries.clear()
+                    self.version = version
+            if version < self.version:
+                # Lookup began before the latest membership change
+                self.misses += 1
+                return None
+        # Single OrderedDict operations are atomic, so a hit needs no lock; the counters
+        # may drop the odd increment under contention, which only blurs the hit rate
+        entry = self.entries.get(key)
+        if entry is not None:
+            node, expires = entry
+            if expires is None or expires > time.monotonic():
+                try:
+                    self.entries.move_to_end(key)
+                except KeyError:
+                    pass  # evicted by another thread in the meantime
+                self.hits += 1
+                return node
+            self.entries.pop(key, None)
+        self.misses += 1
+        return None
+
+    def put(self, key, node, version):
+        with self._lock:
+            if version != self.version:
+                # The ring changed since this lookup started; its answer may be out of date
+                return
+            self.entries[key] = (node, time.monotonic() + self.ttl if self.ttl else None)
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate(),
+        }
@@ -1,38 +1,198 @@
-import hashlib
-import bisect
+import itertools
+import math
+import threading
+
+import numpy as np
+from cache import RoutingCache
+from engines import ENGINES, MASK64, RingEngine
 
 class ConsistentHashing:
-    def __init__(self, num_replicas=3):
+    """
+    Maps keys to nodes with a pluggable engine: "ring" (virtual-node ring, the
+    default), "jump" (jump consistent hash), "maglev" or "rendezvous". See engines.py.
+
+    With `load_factor` set (epsilon), keys are placed with consistent hashing with
+    bounded loads (Mirrokni et al., 2018): assign() skips any node already holding
+    (1 + epsilon) times its weighted share of the assigned keys and moves on to the
+    key's next candidate node. release() frees a key's slot again.
+
+    `version` goes up on every membership change. With `cache_size` set, get_node()
+    answers repeated keys from an LRU cache (entries expire after `cache_ttl` seconds
+    if given) that is emptied whenever the version moves on.
+    """
+
+    def __init__(self, num_replicas=3, engine="ring", load_factor=None, cache_size=0, cache_ttl=None,
+                 **engine_options):
+        if engine not in ENGINES:
+            raise ValueError(f"unknown engine {engine!r}, expected one of {list(ENGINES)}")
+        if load_factor is not None:
+            if load_factor < 0:
+                raise ValueError(f"load_factor must be non-negative, got {load_factor}")
+            if not ENGINES[engine].ordered:
+                raise ValueError(f"bounded loads need a candidate order, which the {engine} engine does not have")
         self.num_replicas = num_replicas
-        self.hash_ring = {}
-        self._sorted_hashes = []
+        if engine == RingEngine.name:
+            engine_options.setdefault("num_replicas", num_replicas)
+        self.engine = ENGINES[engine](**engine_options)
+        self.load_factor = load_factor
+        self.assignments = {}  # key -> node, bounded mode only
+        self.loads = {}        # node -> number of keys assigned to it
+        self.version = 0
+        # Bounded-load placement depends on the current loads, so it is never cached
+        self.cache = RoutingCache(cache_size, cache_ttl) if cache_size and load_factor is None else None
+        self._lock = threading.Lock()
+
+    @property
+    def nodes(self):
+        return self.engine.nodes
+
+    @property
+    def hash_ring(self):
+        """The ring as a {virtual node hash: node} dict (ring engine only)."""
+        return self.engine.hash_ring
 
-    def _hash(self, key):
-        return int(hashlib.md5(key.encode('utf-8')).hexdigest(), 16)
+    @property
+    def _sorted_hashes(self):
+        return self.engine.sorted_hashes
 
-    def add_node(self, node):
-        for i in range(self.num_replicas):
-            hash_key = self._hash(f"{node}-{i}")
-            self.hash_ring[hash_key] = node
-        self._sorted_hashes = sorted(self.hash_ring.keys())
+    def add_node(self, node, weight=1):
+        with self._lock:
+            if node in self.loads:
+                return
+            self.engine.add_node(node, weight)
+            self.loads[node] = 0
+            self.version += 1
 
     def remove_node(self, node):
-        for i in range(self.num_replicas):
-            hash_key = self._hash(f"{node}-{i}")
-            if hash_key in self.hash_ring:
-                del self.hash_ring[hash_key]
-        self._sorted_hashes = sorted(self.hash_ring.keys())
+        with self._lock:
+            if node not in self.loads:
+                return
+            self.engine.remove_node(node)
+            del self.loads[node]
+            self.version += 1
+            # Keys held by the removed node are placed again on the remaining nodes
+            orphans = [key for key, owner in self.assignments.items() if owner == node]
+            for key in orphans:
+                del self.assignments[key]
+            for key in orphans:
+                self._assign(key)
 
-    def get_node(self, key):
-        if not self.hash_ring:
+    def capacity(self, node, total_weight=None):
+        """Most keys `node` may hold once one more key is assigned, or None without bounded loads."""
+        if self.load_factor is None:
             return None
-        hash_key = self._hash(key)
-        
-        # Find the index of the first hash that is >= hash_key
-        idx = bisect.bisect_left(self._sorted_hashes, hash_key)
-        
-        # If the index is out of bounds, it means we need to wrap around to the first node
-        if idx == len(self._sorted_hashes):
-            idx = 0
-            
-        return self.hash_ring[self._sorted_hashes[idx]]
\ No newline at end of file
+        weights = self.engine.weights
+        share = weights[node] / (total_weight or sum(weights.values()))
+        return math.ceil((1 + self.load_factor) * (len(self.assignments) + 1) * share)
+
+    def _bounded_node(self, key):
+        total_weight = sum(self.engine.weights.values())
+        for node in self.engine.candidates(key):
+            if self.loads.get(node, 0) < self.capacity(node, total_weight):
+                return node
+        return None
+
+    def get_node(self, key):
+        if self.cache is not None:
+            # Read the version before the ring: it only moves on after a change is complete
+            version = self.version
+            node = self.cache.get(key, version)
+            if node is None:
+                node = self.engine.get_node(key)
+                if node is not None:
+                    self.cache.put(key, node, version)
+            return node
+        if self.load_factor is None:
+            return self.engine.get_node(key)
+        node = self.assignments.get(key)
+        return node if node is not None else self._bounded_node(key)
+
+    def get_preference_list(self, key, n):
+        """
+        The first `n` distinct nodes for `key`, for placing replicas: on the ring, the nodes
+        met walking clockwise from the key. The first entry is the engine's owner of the key
+        (bounded-load assignments are not consulted).
+        """
+        if not self.engine.ordered:
+            raise ValueError(f"the {self.engine.name} engine has no preference order")
+        return list(itertools.islice(self.engine.candidates(key), n))
+
+    def get_nodes_bulk(self, keys):
+        """Return the node for every key, hashing and searching the whole batch in one vectorized pass."""
+        if self.load_factor is not None:
+            return [self.get_node(key) for key in keys]
+        return self.engine.get_nodes_bulk(keys)
+
+    def _assign(self, key):
+        node = self.assignments.get(key)
+        if node is None:
+            node = self._bounded_node(key)
+            if node is not None:
+                self.assignments[key] = node
+                self.loads[node] += 1
+        return node
+
+    def assign(self, key):
+        """Place `key` under the load bound and count it against its node; returns the node."""
+        if self.load_factor is None:
+            raise ValueError("assign() needs bounded loads; create ConsistentHashing with a load_factor")
+        with self._lock:
+            return self._assign(key)
+
+    def release(self, key):
+        """Remove an assigned key, returning the node that held it (None if it wasn't assigned)."""
+        with self._lock:
+            node = self.assignments.pop(key, None)
+            if node is not None:
+                self.loads[node] -= 1
+            return node
+
+    def node_loads(self):
+        """Weight, assigned keys and capacity of every node."""
+        return {
+            node: {"weight": self.engine.weights[node], "load": self.loads[node], "capacity": self.capacity(node)}
+            for node in self.nodes
+        }
+
+    def plan_migration(self, add=None, remove=()):
+        """
+        Hash ranges that change owner if `add` ({node: weight}, or an iterable of nodes with
+        weight 1) joins and `remove` leaves; see RingEngine.plan_migration. Ring engine only.
+        """
+        if not isinstance(self.engine, RingEngine):
+            raise ValueError(f"the {self.engine.name} engine has no hash ranges to migrate")
+        if add is not None and not isinstance(add, dict):
+            add = dict.fromkeys(add, 1)
+        return self.engine.plan_migration(add, remove)
+
+    def moving_keys(self, moves, keys):
+        """Pick out the keys that fall in a planned move, as {key: (source, destination)}."""
+        if not moves or not keys:
+            return {}
+        # Split the wrapping range at zero so every range is (start, end] with start < end
+        ranges = []
+        for move in moves:
+            pair = (move["source"], move["destination"])
+            if move["start"] < move["end"]:
+                ranges.append((move["start"], move["end"], pair))
+            else:
+                ranges.append((move["start"], MASK64, pair))
+                ranges.append((-1, move["end"], pair))
+        ranges.sort()
+        ends = np.array([end for _, end, _ in ranges], dtype=np.uint64)
+        hashes = self.engine.hash_keys(keys)
+        idx = np.searchsorted(ends, hashes)  # first range ending at or after each key
+        inside = idx < len(ranges)
+        inside[inside] = [int(h) > ranges[i][0] for h, i in zip(hashes[inside].tolist(), idx[inside].tolist())]
+        return {keys[i]: ranges[idx[i]][2] for i in np.flatnonzero(inside).tolist()}
+
+    def memory_bytes(self):
+        return self.engine.memory_bytes()
+
+    def to_dict(self):
+        return {**self.engine.to_dict(), "version": self.version, "load_factor": self.load_factor,
+                "loads": self.node_loads()}
+
+    def to_compact(self):
+        """The engine's state in compact form (see Engine.to_compact), tagged with the ring version."""
+        return {"version": self.version, **self.engine.to_compact()}
@@ -0,0 +1,71 @@
+import argparse
+import time
+
+import numpy as np
+from ch import ConsistentHashing
+from engines import ENGINES
+
+def moved_fraction(before, after):
+    return sum(a != b for a, b in zip(before, after)) / len(before)
+
+def measure(engine, nodes, keys, lookups, num_replicas):
+    """Return lookup latency, memory, load balance and keys moved for one engine."""
+    ch = ConsistentHashing(num_replicas=num_replicas, engine=engine)
+    for i in range(nodes):
+        ch.add_node(f"node-{i}")
+
+    probe = keys[:lookups]
+    start = time.perf_counter_ns()
+    for key in probe:
+        ch.get_node(key)
+    lookup_ns = (time.perf_counter_ns() - start) / len(probe)
+
+    start = time.perf_counter_ns()
+    owners = ch.get_nodes_bulk(keys)
+    bulk_ns = (time.perf_counter_ns() - start) / len(keys)
+
+    # bincount keeps nodes that own no keys, which np.unique would leave out of the spread
+    index = {node: i for i, node in enumerate(ch.nodes)}
+    owner_ids = np.fromiter((index[node] for node in owners), dtype=np.int64, count=len(owners))
+    counts = np.bincount(owner_ids, minlength=len(index))
+    mean = len(keys) / nodes
+    memory = ch.memory_bytes()
+
+    # Keys moved when one node joins, then when a node from the middle leaves
+    ch.add_node(f"node-{nodes}")
+    after_add = ch.get_nodes_bulk(keys)
+    ch.remove_node(f"node-{nodes // 2}")
+    after_remove = ch.get_nodes_bulk(keys)
+
+    return {
+        "lookup_ns": lookup_ns,
+        "bulk_ns": bulk_ns,
+        "memory_bytes": memory,
+        "max_over_mean": counts.max() / mean,
+        "stddev_pct": counts.std() / mean * 100,
+        "moved_on_add": moved_fraction(owners, after_add),
+        "moved_on_remove": moved_fraction(after_add, after_remove),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare consistent hashing engines.")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--keys", type=int, default=1000000, help="keys placed to measure balance and movement")
+    parser.add_argument("--lookups", type=int, default=100000, help="single-key lookups timed")
+    parser.add_argument("--num-replicas", type=int, default=100, help="virtual nodes per node for the ring engine")
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES), default=list(ENGINES))
+    args = parser.parse_args()
+
+    keys = [f"key-{i}" for i in range(args.keys)]
+    print(f"ring engine: {args.num_replicas} virtual nodes per node; ideal keys moved = 1/(nodes+1) on add, 1/nodes on remove")
+    print(f"{'engine':<11} {'nodes':>5} {'lookup ns':>9} {'bulk ns':>8} {'memory':>9} {'max/mean':>8} "
+          f"{'stddev %':>8} {'moved add':>9} {'moved rm':>8}")
+    for nodes in args.nodes:
+        for engine in args.engines:
+            row = measure(engine, nodes, keys, args.lookups, args.num_replicas)
+            print(f"{engine:<11} {nodes:>5} {row['lookup_ns']:>9.0f} {row['bulk_ns']:>8.0f} "
+                  f"{row['memory_bytes']:>9,} {row['max_over_mean']:>8.3f} {row['stddev_pct']:>8.2f} "
+                  f"{row['moved_on_add']:>9.4f} {row['moved_on_remove']:>8.4f}")
+
+if __name__ == "__main__":
+    main()
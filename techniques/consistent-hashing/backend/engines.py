@@ -0,0 +1,499 @@
+import bisect
+import hashlib
+import mmh3
+import numpy as np
+
+MASK64 = (1 << 64) - 1
+
+def hash_key(key):
+    """64-bit murmur3 hash of a key or virtual node name."""
+    return mmh3.hash64(key, signed=False)[0]
+
+def _encode(key):
+    return key.encode() if isinstance(key, str) else key
+
+def md5_key(key):
+    """First 64 bits of the MD5 digest, the hash the ring originally used."""
+    return int.from_bytes(hashlib.md5(_encode(key)).digest()[:8], "little")
+
+def blake2b_key(key):
+    return int.from_bytes(hashlib.blake2b(_encode(key), digest_size=8).digest(), "little")
+
+HASH_FUNCTIONS = {"murmur3": hash_key, "md5": md5_key, "blake2b": blake2b_key}
+
+def hash_keys(keys, hash_function=hash_key):
+    return np.fromiter((hash_function(key) for key in keys), dtype=np.uint64, count=len(keys))
+
+def _mix(x):
+    """splitmix64 finalizer on a Python int."""
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+def _mix_many(x):
+    """splitmix64 finalizer on a uint64 array; matches _mix element-wise."""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+class Engine:
+    """Maps keys to nodes. Subclasses keep whatever structure their algorithm needs."""
+    name = "base"
+    weighted = False  # accepts node weights other than 1
+    ordered = False   # implements candidates(), a per-key fallback order over nodes
+
+    def __init__(self):
+        self._node_names = []  # node id -> name (None once removed)
+        self._node_ids = {}    # name -> node id
+        self.weights = {}      # name -> weight
+
+    @property
+    def nodes(self):
+        return sorted(self._node_ids)
+
+    def _check_weight(self, weight):
+        if weight <= 0:
+            raise ValueError(f"weight must be positive, got {weight}")
+        if weight != 1 and not self.weighted:
+            raise ValueError(f"the {self.name} engine does not support node weights")
+
+    def _register(self, node, weight=1):
+        self._check_weight(weight)
+        node_id = len(self._node_names)
+        self._node_names.append(node)
+        self._node_ids[node] = node_id
+        self.weights[node] = weight
+        return node_id
+
+    def _unregister(self, node):
+        node_id = self._node_ids.pop(node)
+        self._node_names[node_id] = None
+        del self.weights[node]
+        return node_id
+
+    def _names(self, node_ids):
+        return np.array(self._node_names, dtype=object)[node_ids].tolist()
+
+    def add_node(self, node, weight=1):
+        raise NotImplementedError
+
+    def remove_node(self, node):
+        raise NotImplementedError
+
+    def get_node(self, key):
+        raise NotImplementedError
+
+    def candidates(self, key):
+        """Yield every node once, in the order `key` falls back to them; the first is get_node(key)."""
+        raise NotImplementedError
+
+    def get_nodes_bulk(self, keys):
+        raise NotImplementedError
+
+    def memory_bytes(self):
+        """Bytes used by the lookup structure, excluding node names."""
+        raise NotImplementedError
+
+    def to_dict(self):
+        return {"engine": self.name, "nodes": self.nodes, "memory_bytes": self.memory_bytes()}
+
+    def to_compact(self):
+        """A small serialization for clients that rebuild the lookup themselves."""
+        return self.to_dict()
+
+
+class RingEngine(Engine):
+    """
+    Classic consistent hashing ring: each node owns `num_replicas` virtual nodes (scaled
+    by its weight) and a key belongs to the first virtual node at or after its hash.
+    """
+    name = "ring"
+    weighted = True
+    ordered = True
+
+    def __init__(self, num_replicas=3, hash_function="murmur3"):
+        super().__init__()
+        if hash_function not in HASH_FUNCTIONS:
+            raise ValueError(f"unknown hash function {hash_function!r}, expected one of {list(HASH_FUNCTIONS)}")
+        self.num_replicas = num_replicas
+        self.hash_function = hash_function
+        self._hash = HASH_FUNCTIONS[hash_function]
+        # Two parallel arrays sorted by position: virtual node hashes and the owning node id
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._owners = np.empty(0, dtype=np.int32)
+        self._update_views()
+
+    def _update_views(self):
+        # Readers take both arrays from this one tuple, so a concurrent mutation can't pair
+        # an old hash array with new owners. bisect on a memoryview compares plain ints,
+        # much cheaper than a scalar searchsorted call.
+        self._ring = (self._hashes, self._owners, memoryview(self._hashes), memoryview(self._owners))
+
+    @property
+    def hash_ring(self):
+        """The ring as a {virtual node hash: node} dict."""
+        return {h: self._node_names[owner] for h, owner in zip(self._hashes.tolist(), self._owners.tolist())}
+
+    @property
+    def sorted_hashes(self):
+        return self._hashes.tolist()
+
+    def virtual_nodes(self, weight=1):
+        """Number of virtual nodes for a node of the given weight."""
+        return max(1, round(self.num_replicas * weight))
+
+    def hash_keys(self, keys):
+        return hash_keys(keys, self._hash)
+
+    def _virtual_node_hashes(self, node, weight):
+        return np.sort(self.hash_keys([f"{node}-{i}" for i in range(self.virtual_nodes(weight))]))
+
+    def add_node(self, node, weight=1):
+        if node in self._node_ids:
+            return
+        node_id = self._register(node, weight)
+        # Merge only the new virtual nodes into the sorted arrays instead of re-sorting the ring
+        new_hashes = self._virtual_node_hashes(node, weight)
+        positions = np.searchsorted(self._hashes, new_hashes)
+        self._hashes = np.insert(self._hashes, positions, new_hashes)
+        self._owners = np.insert(self._owners, positions, node_id)
+        self._update_views()
+
+    def remove_node(self, node):
+        if node not in self._node_ids:
+            return
+        keep = self._owners != self._unregister(node)
+        self._hashes = self._hashes[keep]
+        self._owners = self._owners[keep]
+        self._update_views()
+
+    def get_node(self, key):
+        _, _, hash_view, owner_view = self._ring
+        if not len(hash_view):
+            return None
+        # First virtual node at or after the key's position, wrapping around to the start
+        idx = bisect.bisect_left(hash_view, self._hash(key))
+        if idx == len(hash_view):
+            idx = 0
+        return self._node_names[owner_view[idx]]
+
+    def candidates(self, key):
+        _, _, hash_view, owner_view = self._ring
+        size = len(hash_view)
+        if not size:
+            return
+        # Walk clockwise from the key, yielding each node the first time one of its virtual nodes comes up
+        start = bisect.bisect_left(hash_view, self._hash(key))
+        seen = set()
+        for i in range(start, start + size):
+            owner = owner_view[i % size]
+            if owner not in seen:
+                seen.add(owner)
+                yield self._node_names[owner]
+                if len(seen) == len(self._node_ids):
+                    return
+
+    def get_nodes_bulk(self, keys):
+        hashes, owners, _, _ = self._ring
+        if not len(hashes):
+            return [None] * len(keys)
+        idx = np.searchsorted(hashes, self.hash_keys(keys))
+        idx[idx == len(hashes)] = 0
+        return self._names(owners[idx])
+
+    def plan_migration(self, add=None, remove=()):
+        """
+        Hash ranges that change owner if the nodes in `add` ({name: weight}) join and those in
+        `remove` leave, without changing the ring. Each move is a dict with the range
+        (start, end] in hash space (it wraps past zero when start > end), the source node and
+        the destination node. Works on virtual node boundaries only, never on keys.
+        """
+        hashes, owners, _, _ = self._ring
+        add = {node: weight for node, weight in (add or {}).items() if node not in self._node_ids}
+        remove = set(remove) & set(self._node_ids)
+        if not add and not remove:
+            return []
+
+        # Build the proposed ring off to the side; new nodes get ids past the current ones
+        names = self._node_names + list(add)
+        keep = ~np.isin(owners, [self._node_ids[node] for node in remove])
+        new_hashes = [hashes[keep]]
+        new_owners = [owners[keep]]
+        for offset, (node, weight) in enumerate(add.items()):
+            self._check_weight(weight)
+            node_hashes = self._virtual_node_hashes(node, weight)
+            new_hashes.append(node_hashes)
+            new_owners.append(np.full(len(node_hashes), len(self._node_names) + offset, dtype=np.int32))
+        new_hashes = np.concatenate(new_hashes)
+        new_owners = np.concatenate(new_owners)
+        order = np.argsort(new_hashes, kind="stable")
+        new_hashes, new_owners = new_hashes[order], new_owners[order]
+        if not len(hashes) or not len(new_hashes):
+            return []
+
+        # Every virtual node of either ring is a boundary. Between two neighbouring boundaries
+        # both rings have a single owner: the owner of their first virtual node at or after the
+        # upper boundary. Interval i is (boundaries[i - 1], boundaries[i]]; interval 0 wraps.
+        boundaries = np.union1d(hashes, new_hashes)
+        before = owners[np.searchsorted(hashes, boundaries) % len(hashes)]
+        after = new_owners[np.searchsorted(new_hashes, boundaries) % len(new_hashes)]
+        starts = np.roll(boundaries, 1).tolist()
+        ends = boundaries.tolist()
+
+        moves = []
+        for i in np.flatnonzero(before != after).tolist():
+            source, destination = names[before[i]], names[after[i]]
+            last = moves[-1] if moves else None
+            if last and last["end"] == starts[i] and (last["source"], last["destination"]) == (source, destination):
+                last["end"] = ends[i]
+            else:
+                moves.append({"start": starts[i], "end": ends[i], "source": source, "destination": destination})
+        # The wrapping interval comes first; join it with the last move if they are contiguous
+        if len(moves) > 1 and moves[-1]["end"] == moves[0]["start"] and \
+                (moves[-1]["source"], moves[-1]["destination"]) == (moves[0]["source"], moves[0]["destination"]):
+            moves[0]["start"] = moves.pop()["start"]
+        return moves
+
+    def ownership(self):
+        """Fraction of the hash space each node owns."""
+        hashes, owners, _, _ = self._ring
+        if not len(hashes):
+            return {}
+        # A virtual node owns the arc from its predecessor up to itself; the first one also owns the wrap-around
+        arcs = np.diff(hashes, prepend=np.uint64(0)).astype(np.float64)
+        arcs[0] += float(MASK64 - int(hashes[-1]))
+        shares = np.bincount(owners, weights=arcs, minlength=len(self._node_names)) / float(1 << 64)
+        return {name: float(shares[node_id]) for name, node_id in self._node_ids.items()}
+
+    def memory_bytes(self):
+        return self._hashes.nbytes + self._owners.nbytes
+
+    def to_dict(self):
+        return {
+            "engine": self.name,
+            "num_replicas": self.num_replicas,
+            "hash_function": self.hash_function,
+            "sorted_hashes": self.sorted_hashes,
+            "hash_ring": self.hash_ring,
+            "ownership": self.ownership(),
+        }
+
+    def to_compact(self):
+        # Owners as indexes into the node list instead of a {hash: name} dict, which repeats
+        # every name num_replicas times and turns every hash into a string key
+        hashes, owners, _, _ = self._ring
+        nodes = self.nodes
+        positions = np.zeros(len(self._node_names), dtype=np.int32)
+        positions[[self._node_ids[node] for node in nodes]] = np.arange(len(nodes), dtype=np.int32)
+        return {
+            "engine": self.name,
+            "num_replicas": self.num_replicas,
+            "hash_function": self.hash_function,
+            "nodes": nodes,
+            "hashes": hashes.tolist(),
+            "owners": positions[owners].tolist(),
+        }
+
+
+class JumpHashEngine(Engine):
+    """
+    Jump consistent hash (Lamping & Veach, 2014): O(1) memory, keys spread evenly over
+    buckets 0..n-1. Buckets can only be added or removed at the end, so removing a node
+    other than the last moves the last node into its bucket; that node's keys move too.
+    """
+    name = "jump"
+
+    def __init__(self):
+        super().__init__()
+        self._buckets = []  # bucket -> node id
+
+    def add_node(self, node, weight=1):
+        if node not in self._node_ids:
+            self._buckets.append(self._register(node, weight))
+
+    def remove_node(self, node):
+        if node not in self._node_ids:
+            return
+        bucket = self._buckets.index(self._unregister(node))
+        last = self._buckets.pop()
+        if bucket < len(self._buckets):
+            self._buckets[bucket] = last
+
+    @staticmethod
+    def _jump(key, num_buckets):
+        b, j = -1, 0
+        while j < num_buckets:
+            b = j
+            key = (key * 2862933555777941757 + 1) & MASK64
+            j = int((b + 1) * ((1 << 31) / ((key >> 33) + 1)))
+        return b
+
+    def get_node(self, key):
+        buckets = self._buckets
+        if not buckets:
+            return None
+        return self._node_names[buckets[self._jump(hash_key(key), len(buckets))]]
+
+    def get_nodes_bulk(self, keys):
+        buckets = np.array(self._buckets, dtype=np.int64)
+        if not len(buckets):
+            return [None] * len(keys)
+        # Run the jump loop for every key at once, masking out keys that have finished
+        key = hash_keys(keys)
+        b = np.full(len(keys), -1, dtype=np.int64)
+        j = np.zeros(len(keys), dtype=np.int64)
+        active = j < len(buckets)
+        while active.any():
+            b[active] = j[active]
+            key[active] = key[active] * np.uint64(2862933555777941757) + np.uint64(1)
+            j[active] = ((b[active] + 1) * (float(1 << 31) / ((key[active] >> np.uint64(33)) + np.uint64(1)))).astype(np.int64)
+            active = j < len(buckets)
+        return self._names(buckets[b])
+
+    def memory_bytes(self):
+        # Only the bucket -> node mapping; the algorithm itself needs no table
+        return 8 * len(self._buckets)
+
+    def to_dict(self):
+        return {"engine": self.name, "buckets": [self._node_names[i] for i in self._buckets],
+                "memory_bytes": self.memory_bytes()}
+
+
+class MaglevEngine(Engine):
+    """
+    Maglev hashing (Eisenbud et al., 2016): every node fills slots of a prime-sized
+    lookup table in its own permutation order, taking turns, so each node gets an
+    almost equal share and a lookup is one table read. The table is rebuilt on every
+    membership change.
+    """
+    name = "maglev"
+
+    def __init__(self, table_size=65537):
+        super().__init__()
+        self.table_size = table_size  # should be prime and much larger than the node count
+        self._table = np.empty(0, dtype=np.int32)
+
+    def _populate(self):
+        node_ids = [self._node_ids[name] for name in self.nodes]
+        m = self.table_size
+        table = [-1] * m
+        if node_ids:
+            offsets = [hash_key(self._node_names[i]) % m for i in node_ids]
+            skips = [_mix(hash_key(self._node_names[i])) % (m - 1) + 1 for i in node_ids]
+            next_index = [0] * len(node_ids)
+            filled = 0
+            while filled < m:
+                for n, node_id in enumerate(node_ids):
+                    # Walk this node's permutation to its next free slot
+                    slot = (offsets[n] + next_index[n] * skips[n]) % m
+                    while table[slot] >= 0:
+                        next_index[n] += 1
+                        slot = (offsets[n] + next_index[n] * skips[n]) % m
+                    table[slot] = node_id
+                    next_index[n] += 1
+                    filled += 1
+                    if filled == m:
+                        break
+        self._table = np.array(table, dtype=np.int32)
+        self._table_view = memoryview(self._table)
+
+    def add_node(self, node, weight=1):
+        if node not in self._node_ids:
+            self._register(node, weight)
+            self._populate()
+
+    def remove_node(self, node):
+        if node in self._node_ids:
+            self._unregister(node)
+            self._populate()
+
+    def get_node(self, key):
+        table = self._table_view if len(self._table) else None
+        if table is None or table[0] < 0:
+            return None
+        return self._node_names[table[hash_key(key) % self.table_size]]
+
+    def get_nodes_bulk(self, keys):
+        table = self._table
+        if not len(table) or table[0] < 0:
+            return [None] * len(keys)
+        return self._names(table[hash_keys(keys) % np.uint64(self.table_size)])
+
+    def memory_bytes(self):
+        return self._table.nbytes
+
+    def to_dict(self):
+        return {"engine": self.name, "nodes": self.nodes, "table_size": self.table_size,
+                "memory_bytes": self.memory_bytes()}
+
+
+class RendezvousEngine(Engine):
+    """
+    Rendezvous (highest random weight) hashing: a key goes to the node with the highest
+    mix(key hash ^ node hash). No table at all, and only the keys of an added or removed
+    node move, but a lookup scores every node.
+    """
+    name = "rendezvous"
+    ordered = True
+
+    def __init__(self):
+        super().__init__()
+        self._publish(np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int32))
+
+    def _publish(self, seeds, ids):
+        # Hash of each live node and its node id, in parallel; readers take everything from
+        # this one tuple, so a concurrent add or remove can't pair new seeds with old ids.
+        # Single-key lookups score plain ints, so the list forms are built here, once.
+        self._members = (seeds, ids, seeds.tolist(), [self._node_names[node_id] for node_id in ids.tolist()])
+
+    def add_node(self, node, weight=1):
+        if node not in self._node_ids:
+            node_id = self._register(node, weight)
+            seeds, ids, _, _ = self._members
+            self._publish(np.append(seeds, np.uint64(hash_key(node))), np.append(ids, np.int32(node_id)))
+
+    def remove_node(self, node):
+        if node in self._node_ids:
+            seeds, ids, _, _ = self._members
+            keep = ids != self._unregister(node)
+            self._publish(seeds[keep], ids[keep])
+
+    def get_node(self, key):
+        _, _, seeds, names = self._members
+        if not seeds:
+            return None
+        h = hash_key(key)
+        best = max(range(len(seeds)), key=lambda i: _mix(h ^ seeds[i]))
+        return names[best]
+
+    def candidates(self, key):
+        _, _, seeds, names = self._members
+        h = hash_key(key)
+        for i in sorted(range(len(seeds)), key=lambda i: _mix(h ^ seeds[i]), reverse=True):
+            yield names[i]
+
+    def get_nodes_bulk(self, keys):
+        seeds, _, _, names = self._members
+        if not len(seeds):
+            return [None] * len(keys)
+        hashes = hash_keys(keys)
+        winners = np.empty(len(keys), dtype=np.int32)
+        # Score in chunks so the keys x nodes matrix stays small
+        chunk = max(1, (1 << 22) // len(seeds))
+        for start in range(0, len(keys), chunk):
+            scores = _mix_many(hashes[start:start + chunk, None] ^ seeds[None, :])
+            winners[start:start + chunk] = np.argmax(scores, axis=1)
+        return np.array(names, dtype=object)[winners].tolist()
+
+    def memory_bytes(self):
+        seeds, ids, _, _ = self._members
+        return seeds.nbytes + ids.nbytes
+
+
+ENGINES = {
+    RingEngine.name: RingEngine,
+    JumpHashEngine.name: JumpHashEngine,
+    MaglevEngine.name: MaglevEngine,
+    RendezvousEngine.name: RendezvousEngine,
+}
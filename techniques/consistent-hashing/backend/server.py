@@ -1,5 +1,7 @@
+import json
+import os
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 from fastapi.middleware.cors import CORSMiddleware
@@ -8,10 +10,18 @@ from ch import ConsistentHashing
 
 class NodeModel(BaseModel):
     name: str
+    weight: float = 1.0
 
 class KeyModel(BaseModel):
     key: str
 
+class KeysModel(BaseModel):
+    keys: List[str]
+
+class MigrationModel(BaseModel):
+    add: List[NodeModel] = []
+    remove: List[str] = []
+
 app = FastAPI(
     title="Consistent Hashing API",
     description="An API to interact with a Consistent Hashing implementation.",
@@ -26,15 +36,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize the Consistent Hashing ring
-ch = ConsistentHashing(num_replicas=3)
+# Initialize the Consistent Hashing ring; CH_ENGINE picks ring, jump, maglev or rendezvous,
+# and CH_LOAD_FACTOR (epsilon) turns on bounded loads. 100 virtual nodes per node keeps the
+# load within about 10% of the mean (see simulate.py); 3 left some nodes with over twice the mean.
+# Single-key lookups go through an LRU cache of CH_CACHE_SIZE keys (0 disables it), emptied on
+# every membership change; CH_CACHE_TTL optionally expires entries after that many seconds.
+load_factor = os.environ.get("CH_LOAD_FACTOR")
+cache_ttl = os.environ.get("CH_CACHE_TTL")
+ch = ConsistentHashing(
+    num_replicas=int(os.environ.get("CH_NUM_REPLICAS", 100)),
+    engine=os.environ.get("CH_ENGINE", "ring"),
+    load_factor=float(load_factor) if load_factor else None,
+    cache_size=int(os.environ.get("CH_CACHE_SIZE", 100000)),
+    cache_ttl=float(cache_ttl) if cache_ttl else None,
+)
+
+# (ring version, serialized compact ring), rebuilt by GET /ring/ only after a membership change
+ring_json = (None, b"")
 
 @app.post("/nodes/", status_code=201, tags=["Nodes"])
 def add_node(node: NodeModel):
     """
-    Adds a new node to the consistent hashing ring.
+    Adds a new node to the consistent hashing ring. A node's weight scales its share of the keys.
     """
-    ch.add_node(node.name)
+    try:
+        ch.add_node(node.name, node.weight)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {"message": f"Node '{node.name}' added successfully."}
 
 @app.delete("/nodes/{node_name}", status_code=200, tags=["Nodes"])
@@ -50,27 +78,97 @@ def get_nodes():
     """
     Gets all unique nodes in the ring.
     """
-    if not ch.hash_ring:
-        return []
-    return sorted(list(set(ch.hash_ring.values())))
+    return ch.nodes
 
 @app.get("/keys/{key}", tags=["Keys"])
 def get_node_for_key(key: str):
     """
     Gets the node that a specific key is mapped to.
     """
-    if not ch.hash_ring:
+    if not ch.nodes:
         raise HTTPException(status_code=404, detail="Hash ring is empty.")
     node = ch.get_node(key)
     return {"key": key, "node": node}
 
+@app.get("/keys/{key}/replicas", tags=["Keys"])
+def get_replicas_for_key(key: str, n: int = 3):
+    """
+    Gets the preference list for a key: up to n distinct nodes to hold its replicas, owner first.
+    """
+    if not ch.nodes:
+        raise HTTPException(status_code=404, detail="Hash ring is empty.")
+    try:
+        return {"key": key, "nodes": ch.get_preference_list(key, n)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/keys/bulk", tags=["Keys"])
+def get_nodes_for_keys(keys: KeysModel):
+    """
+    Gets the node for every key in one vectorized lookup.
+    """
+    if not ch.nodes:
+        raise HTTPException(status_code=404, detail="Hash ring is empty.")
+    return {"nodes": dict(zip(keys.keys, ch.get_nodes_bulk(keys.keys)))}
+
+@app.post("/keys/assign", tags=["Keys"])
+def assign_key(key: KeyModel):
+    """
+    Assigns a key to a node under the load bound and counts it towards that node's load.
+    """
+    if ch.load_factor is None:
+        raise HTTPException(status_code=400, detail="Bounded loads are disabled; set CH_LOAD_FACTOR.")
+    if not ch.nodes:
+        raise HTTPException(status_code=404, detail="Hash ring is empty.")
+    return {"key": key.key, "node": ch.assign(key.key)}
+
+@app.delete("/keys/{key}", tags=["Keys"])
+def release_key(key: str):
+    """
+    Releases an assigned key, freeing its slot on the node that held it.
+    """
+    node = ch.release(key)
+    if node is None:
+        raise HTTPException(status_code=404, detail=f"Key '{key}' is not assigned.")
+    return {"key": key, "node": node}
+
 @app.get("/ring/", tags=["Ring"])
-def get_ring():
+def get_ring(full: bool = False):
+    """
+    Returns the current hash ring (or the active engine's state) with the weight, assigned load and
+    capacity of every node. The ring is sent as sorted hashes plus owner indexes into the node list and
+    is only re-serialized after a membership change; pass full=true for the verbose {hash: node} form.
+    """
+    global ring_json
+    if full:
+        return ch.to_dict()
+    version, body = ring_json
+    if version != ch.version:
+        version = ch.version
+        body = json.dumps(ch.to_compact(), separators=(",", ":")).encode()
+        ring_json = (version, body)
+    # Loads change with every assignment, so they are appended to the cached body rather than cached
+    loads = json.dumps({"load_factor": ch.load_factor, "loads": ch.node_loads()}, separators=(",", ":"))
+    return Response(body[:-1] + b"," + loads[1:].encode(), media_type="application/json")
+
+@app.get("/cache/", tags=["Ring"])
+def get_cache_stats():
+    """
+    Returns the size and hit rate of the key-to-node cache.
+    """
+    if ch.cache is None:
+        raise HTTPException(status_code=404, detail="The key cache is disabled.")
+    return ch.cache.stats()
+
+@app.post("/ring/plan", tags=["Ring"])
+def plan_migration(change: MigrationModel):
     """
-    Returns a representation of the current hash ring for visualization.
+    Plans a membership change without applying it: the hash ranges that would change owner,
+    each with its source and destination node, and the fraction of the hash space they cover.
     """
-    return {
-        "num_replicas": ch.num_replicas,
-        "sorted_hashes": ch._sorted_hashes,
-        "hash_ring": ch.hash_ring
-    }
+    try:
+        moves = ch.plan_migration({node.name: node.weight for node in change.add}, change.remove)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    moved = sum((move["end"] - move["start"]) % (1 << 64) for move in moves)
+    return {"moves": moves, "moved_fraction": moved / (1 << 64)}
@@ -0,0 +1,96 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from ch import ConsistentHashing
+from engines import HASH_FUNCTIONS
+
+def key_weights(num_keys, distribution, zipf_s):
+    """Requests per key: 1 each for uniform, or proportional to 1/rank^s for Zipf."""
+    if distribution == "uniform":
+        return np.ones(num_keys)
+    ranks = np.arange(1, num_keys + 1, dtype=np.float64)
+    # Shuffle so the hottest keys aren't all adjacent in key order
+    weights = np.random.default_rng(0).permutation(ranks ** -zipf_s)
+    return weights * (num_keys / weights.sum())
+
+def node_loads(ch, keys, weights):
+    owners = ch.get_nodes_bulk(keys)
+    index = {node: i for i, node in enumerate(ch.nodes)}
+    ids = np.fromiter((index[node] for node in owners), dtype=np.int64, count=len(owners))
+    return owners, np.bincount(ids, weights=weights, minlength=len(index))
+
+def moved(before, after, weights):
+    changed = np.fromiter((a != b for a, b in zip(before, after)), dtype=bool, count=len(before))
+    return changed.mean(), weights[changed].sum() / weights.sum()
+
+def simulate(config):
+    """Place every key for one (num_replicas, hash function, nodes) configuration and measure it."""
+    num_replicas, hash_function, nodes, num_keys, distribution, zipf_s, lookups = config
+    keys = [f"key-{i}" for i in range(num_keys)]
+    weights = key_weights(num_keys, distribution, zipf_s)
+
+    ch = ConsistentHashing(num_replicas=num_replicas, hash_function=hash_function)
+    for i in range(nodes):
+        ch.add_node(f"node-{i}")
+
+    start = time.perf_counter()
+    owners, loads = node_loads(ch, keys, weights)
+    bulk_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for key in keys[:lookups]:
+        ch.get_node(key)
+    lookup_seconds = time.perf_counter() - start
+    mean = loads.mean()
+
+    ch.add_node(f"node-{nodes}")
+    after_add = ch.get_nodes_bulk(keys)
+    ch.remove_node("node-0")
+    after_remove = ch.get_nodes_bulk(keys)
+
+    return {
+        "num_replicas": num_replicas,
+        "hash_function": hash_function,
+        "nodes": nodes,
+        "stddev_pct": loads.std() / mean * 100,
+        "max_over_mean": loads.max() / mean,
+        "memory_bytes": ch.memory_bytes(),
+        "lookups_per_sec": min(lookups, num_keys) / lookup_seconds if lookup_seconds else 0.0,
+        "bulk_per_sec": num_keys / bulk_seconds if bulk_seconds else 0.0,
+        # Fraction of keys, and of requests, that change node
+        "moved_on_add": moved(owners, after_add, weights),
+        "moved_on_remove": moved(after_add, after_remove, weights),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate key placement across consistent hashing ring configurations.")
+    parser.add_argument("--keys", type=int, default=1000000, help="synthetic keys placed on the ring")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[10], help="node counts to simulate")
+    parser.add_argument("--num-replicas", type=int, nargs="+", default=[1, 3, 10, 50, 100, 200, 500],
+                        help="virtual node counts to sweep")
+    parser.add_argument("--hash-functions", nargs="+", choices=list(HASH_FUNCTIONS), default=list(HASH_FUNCTIONS))
+    parser.add_argument("--distribution", choices=["uniform", "zipf"], default="uniform",
+                        help="how requests spread over keys; loads count requests, not keys")
+    parser.add_argument("--zipf-s", type=float, default=1.0, help="Zipf exponent")
+    parser.add_argument("--lookups", type=int, default=100000, help="single-key lookups timed")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes running configurations")
+    args = parser.parse_args()
+
+    configs = [
+        (num_replicas, hash_function, nodes, args.keys, args.distribution, args.zipf_s, args.lookups)
+        for nodes in args.nodes for hash_function in args.hash_functions for num_replicas in args.num_replicas
+    ]
+    print(f"{args.keys:,} keys, {args.distribution} requests; moved = fraction of keys / of requests")
+    print(f"{'vnodes':>6} {'hash':<8} {'nodes':>5} {'stddev %':>8} {'max/mean':>8} {'memory':>10} "
+          f"{'lookups/s':>10} {'bulk/s':>10} {'moved on add':>13} {'moved on remove':>15}")
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for row in pool.map(simulate, configs):
+            print(f"{row['num_replicas']:>6} {row['hash_function']:<8} {row['nodes']:>5} {row['stddev_pct']:>8.2f} "
+                  f"{row['max_over_mean']:>8.3f} {row['memory_bytes']:>10,} {row['lookups_per_sec']:>10,.0f} "
+                  f"{row['bulk_per_sec']:>10,.0f} {'%.4f / %.4f' % row['moved_on_add']:>13} "
+                  f"{'%.4f / %.4f' % row['moved_on_remove']:>15}")
+
+if __name__ == "__main__":
+    main()
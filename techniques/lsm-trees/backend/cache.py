@@ -0,0 +1,51 @@
+import threading
+from collections import OrderedDict
+
+class BlockCache:
+    """Size-aware LRU cache of decoded SSTable blocks, shared by every table of a tree."""
+
+    def __init__(self, capacity_bytes=8 * 1024 * 1024):
+        self.capacity = capacity_bytes
+        self.usage = 0
+        self.entries = OrderedDict()  # key -> (value, charge), least recently used first
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, charge):
+        if charge > self.capacity:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.usage -= old[1]
+            self.entries[key] = (value, charge)
+            self.usage += charge
+            while self.usage > self.capacity:
+                _, (_, evicted_charge) = self.entries.popitem(last=False)
+                self.usage -= evicted_charge
+                self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "capacity_bytes": self.capacity,
+                "usage_bytes": self.usage,
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,265 @@
+import heapq
+import math
+import time
+from sstable import TOMBSTONE
+
+
+def merge_iterators(iterators):
+    """
+    Merge sorted (key, value) iterators into one sorted stream, newest version wins.
+
+    `iterators` is ordered newest first. Only one pending entry per input is held
+    in memory, so the merge streams block by block regardless of the data size.
+    """
+    def tagged(rank, iterator):
+        for key, value in iterator:
+            yield key, rank, value
+
+    last_key = None
+    for key, _, value in heapq.merge(*(tagged(rank, it) for rank, it in enumerate(iterators))):
+        if key != last_key:
+            last_key = key
+            yield key, value
+
+
+class CompactionStats:
+    def __init__(self, strategy, input_level, output_level):
+        self.strategy = strategy
+        self.input_level = input_level
+        self.output_level = output_level
+        self.input_files = 0
+        self.output_files = 0
+        self.bytes_read = 0
+        self.upper_bytes_read = 0  # bytes read from input_level, excluding output_level files
+        self.bytes_written = 0
+        self.entries_written = 0
+        self.duration = 0.0
+
+    @property
+    def write_amplification(self):
+        """Bytes written per byte pushed down from the input level."""
+        return self.bytes_written / self.upper_bytes_read if self.upper_bytes_read else 0.0
+
+    def to_dict(self):
+        return {
+            "strategy": self.strategy,
+            "input_level": self.input_level,
+            "output_level": self.output_level,
+            "input_files": self.input_files,
+            "output_files": self.output_files,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "entries_written": self.entries_written,
+            "write_amplification": round(self.write_amplification, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+        }
+
+
+class Compaction:
+    """A set of input tables picked by a strategy, merged into `output_level`."""
+
+    def __init__(self, strategy, inputs, output_level, drop_tombstones, split_outputs=True):
+        self.strategy = strategy
+        self.inputs = inputs  # list of (level, SSTable), newest data first
+        self.output_level = output_level
+        self.drop_tombstones = drop_tombstones
+        # Leveled outputs are cut into target-sized files; a size-tiered output is one sorted run
+        self.split_outputs = split_outputs
+
+    def run(self, new_writer, open_sstable, target_file_size):
+        """
+        Stream-merge the inputs into new tables of at most ~target_file_size bytes each.
+
+        `new_writer(expected_keys)` returns an SSTableWriter for a fresh file and
+        `open_sstable(path)` opens a finished one.
+        """
+        if not self.split_outputs:
+            target_file_size = float("inf")
+        input_level = min(level for level, _ in self.inputs)
+        stats = CompactionStats(self.strategy.name, input_level, self.output_level)
+        start = time.perf_counter()
+
+        total_entries = sum(sstable.count for _, sstable in self.inputs)
+        total_bytes = sum(sstable.size for _, sstable in self.inputs)
+        # Writers need a key count up front to size their Bloom filters
+        bytes_per_entry = total_bytes / total_entries if total_entries else 1
+        expected_keys = total_entries
+        if self.split_outputs:
+            expected_keys = min(total_entries, int(math.ceil(target_file_size / bytes_per_entry)) + 1)
+
+        outputs = []
+        writer = None
+        # Compaction reads every block once; keep them out of the block cache
+        merged = merge_iterators([sstable.items(fill_cache=False) for _, sstable in self.inputs])
+        for key, value in merged:
+            if value == TOMBSTONE and self.drop_tombstones:
+                continue
+            if writer is None:
+                writer = new_writer(expected_keys)
+            writer.add(key, value)
+            stats.entries_written += 1
+            if writer.estimated_size() >= target_file_size:
+                outputs.append(open_sstable(writer.finish()))
+                writer = None
+        if writer is not None:
+            outputs.append(open_sstable(writer.finish()))
+
+        for level, sstable in self.inputs:
+            stats.input_files += 1
+            stats.bytes_read += sstable.size
+            if level != self.output_level or level == input_level:
+                stats.upper_bytes_read += sstable.size
+        stats.output_files = len(outputs)
+        stats.bytes_written = sum(sstable.size for sstable in outputs)
+        stats.duration = time.perf_counter() - start
+        return outputs, stats
+
+    def install(self, levels, outputs):
+        """Return a new levels list with the inputs replaced by `outputs`."""
+        input_ids = {id(sstable) for _, sstable in self.inputs}
+        levels = [list(level) for level in levels]
+        while len(levels) <= self.output_level:
+            levels.append([])
+
+        if self.output_level == 0:
+            # Level 0 is ordered by age: outputs take the place of their (contiguous) inputs
+            position = min(i for i, sstable in enumerate(levels[0]) if id(sstable) in input_ids)
+            remaining = [sstable for sstable in levels[0] if id(sstable) not in input_ids]
+            levels[0] = remaining[:position] + outputs + remaining[position:]
+        for i in range(len(levels)):
+            if i == 0 and self.output_level == 0:
+                continue
+            levels[i] = [sstable for sstable in levels[i] if id(sstable) not in input_ids]
+        if self.output_level > 0:
+            # Deeper levels hold non-overlapping tables sorted by key range
+            levels[self.output_level] = sorted(levels[self.output_level] + outputs,
+                                               key=lambda sstable: sstable.smallest_key)
+        return levels
+
+
+def _overlapping(tables, smallest, largest):
+    return [sstable for sstable in tables if sstable.overlaps(smallest, largest)]
+
+
+def _key_range(tables):
+    tables = [sstable for sstable in tables if sstable.count]
+    if not tables:
+        return None, None
+    return min(t.smallest_key for t in tables), max(t.largest_key for t in tables)
+
+
+def _has_data_below(levels, level, smallest, largest):
+    return any(_overlapping(tables, smallest, largest) for tables in levels[level + 1:])
+
+
+class CompactionStrategy:
+    name = "base"
+    # Writers stall when level 0 holds this many tables
+    l0_stall_trigger = 8
+
+    def pick(self, levels):
+        """Return the next Compaction to run for `levels`, or None when the shape is healthy."""
+        raise NotImplementedError
+
+
+class LeveledCompaction(CompactionStrategy):
+    """
+    LevelDB-style leveling: L0 holds overlapping flushed tables; L1..Ln each hold
+    non-overlapping tables and are `size_ratio` times larger than the level above.
+    """
+    name = "leveled"
+
+    def __init__(self, l0_trigger=4, base_level_bytes=10 * 1024 * 1024, size_ratio=10, max_levels=7):
+        self.l0_trigger = l0_trigger
+        self.base_level_bytes = base_level_bytes
+        self.size_ratio = size_ratio
+        self.max_levels = max_levels
+        self.l0_stall_trigger = 2 * l0_trigger
+
+    def target_bytes(self, level):
+        return self.base_level_bytes * self.size_ratio ** (level - 1)
+
+    def pick(self, levels):
+        if len(levels[0]) >= self.l0_trigger:
+            return self._compaction_into(levels, 0, list(levels[0]))
+
+        for level in range(1, min(len(levels), self.max_levels - 1)):
+            level_bytes = sum(sstable.size for sstable in levels[level])
+            if level_bytes <= self.target_bytes(level):
+                continue
+            # Push down the table whose key range overlaps the least data in the next level
+            next_level = levels[level + 1] if level + 1 < len(levels) else []
+
+            def overlap_ratio(sstable):
+                overlap = sum(t.size for t in _overlapping(next_level, sstable.smallest_key, sstable.largest_key))
+                return overlap / max(sstable.size, 1)
+
+            candidates = [sstable for sstable in levels[level] if sstable.count]
+            if candidates:
+                return self._compaction_into(levels, level, [min(candidates, key=overlap_ratio)])
+        return None
+
+    def _compaction_into(self, levels, level, tables):
+        output_level = level + 1
+        smallest, largest = _key_range(tables)
+        lower = []
+        if smallest is not None and output_level < len(levels):
+            lower = _overlapping(levels[output_level], smallest, largest)
+        # Newest data first: L0 tables newest to oldest, then the level below
+        inputs = [(level, sstable) for sstable in reversed(tables)] + [(output_level, sstable) for sstable in lower]
+        all_smallest, all_largest = _key_range(tables + lower)
+        drop_tombstones = all_smallest is None or not _has_data_below(levels, output_level, all_smallest, all_largest)
+        return Compaction(self, inputs, output_level, drop_tombstones)
+
+
+class SizeTieredCompaction(CompactionStrategy):
+    """
+    Size-tiered (universal-style) compaction: every table is a sorted run in L0,
+    ordered by age. Runs of similar size that are adjacent in age are merged
+    together, so each key is rewritten roughly log(N) times.
+    """
+    name = "size_tiered"
+
+    def __init__(self, min_threshold=4, max_threshold=32, bucket_ratio=2.0, max_runs=24):
+        self.min_threshold = min_threshold
+        self.max_threshold = max_threshold
+        self.bucket_ratio = bucket_ratio
+        self.max_runs = max_runs
+        self.l0_stall_trigger = max_runs + min_threshold
+
+    def pick(self, levels):
+        runs = levels[0]
+        if len(runs) < self.min_threshold:
+            return None
+
+        # Look for the newest window of age-adjacent runs whose sizes are within bucket_ratio
+        best = None
+        for end in range(len(runs), self.min_threshold - 1, -1):
+            start = end - 1
+            low = high = max(runs[start].size, 1)
+            while start > 0 and end - start < self.max_threshold:
+                size = max(runs[start - 1].size, 1)
+                if max(high, size) > self.bucket_ratio * min(low, size):
+                    break
+                low, high = min(low, size), max(high, size)
+                start -= 1
+            if end - start >= self.min_threshold:
+                best = (start, end)
+                break
+
+        if best is None and len(runs) >= self.max_runs:
+            # Too many runs with no similar-sized bucket: merge the newest ones to bound read cost
+            best = (len(runs) - self.min_threshold, len(runs))
+        if best is None:
+            return None
+
+        start, end = best
+        inputs = [(0, sstable) for sstable in reversed(runs[start:end])]
+        # Tombstones may only be dropped when nothing older could still hold the key
+        return Compaction(self, inputs, 0, drop_tombstones=start == 0, split_outputs=False)
+
+
+STRATEGIES = {
+    LeveledCompaction.name: LeveledCompaction,
+    SizeTieredCompaction.name: SizeTieredCompaction,
+}
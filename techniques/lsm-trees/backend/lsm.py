@@ -1,110 +1,595 @@
-import os
-import time
+import bisect
 import json
+import os
+import re
+import threading
+from collections import deque
 from sortedcontainers import SortedDict
-from bloom import BloomFilter
+from cache import BlockCache
+from compaction import LeveledCompaction, merge_iterators
+from manifest import Manifest
+from sstable import SSTable, SSTableWriter, write_sstable, TOMBSTONE
+from wal import WriteAheadLog, BUFFERED, read_records
+
+# Every file the tree owns is named after a number from one monotonic counter
+FILE_NAME = re.compile(r"^(wal|sstable)_(\d+)\.(log|sst)$")
+# Files of the original single-file store: JSON-lines SSTables named after the flush time
+# (with .bf Bloom filters beside them) and one JSON-lines wal.log
+LEGACY_SSTABLE = re.compile(r"^sstable_(\d+)(_compacted)?\.log$")
+LEGACY_WAL = "wal.log"
 
-TOMBSTONE = "__TOMBSTONE__"
+def _visible(versions, sequence):
+    """Return the newest value in a [(sequence, value), ...] list visible at `sequence`."""
+    if sequence is None:
+        return versions[-1][1]
+    for version_sequence, value in reversed(versions):
+        if version_sequence <= sequence:
+            return value
+    return None
 
 class MemTable:
-    def __init__(self, threshold):
+    def __init__(self, threshold, wal_path, wal_mode=BUFFERED, number=0):
         self.threshold = threshold
+        self.number = number  # file number of the WAL
+        # key -> [(sequence, value), ...] oldest first; older versions are only kept
+        # while a snapshot may still need them
         self.data = SortedDict()
-        self.wal = open("wal.log", "a")
+        self.wal = WriteAheadLog(wal_path, wal_mode)
 
-    def set(self, key, value):
-        self.wal.write(json.dumps({"key": key, "value": value}) + "\n")
-        self.wal.flush()
-        self.data[key] = value
+    @property
+    def name(self):
+        return f"memtable_{self.number:06d}"
+
+    def replay(self, sequence):
+        """Re-apply every intact record of an existing WAL, e.g. after a restart; returns the last sequence."""
+        for ops in read_records(self.wal.path):
+            self._insert(ops, sequence + 1, None)
+            sequence += len(ops)
+        return sequence
+
+    def apply(self, ops, first_sequence, oldest_snapshot):
+        """Log (key, value) ops as one WAL record and apply them; returns the WAL sequence to wait on."""
+        seq = self.wal.enqueue(ops)
+        self._insert(ops, first_sequence, oldest_snapshot)
+        return seq
+
+    def _insert(self, ops, first_sequence, oldest_snapshot):
+        if oldest_snapshot is None:
+            # Nobody can see older versions, so each key keeps only its newest one
+            self.data.update((key, [(first_sequence + i, value)]) for i, (key, value) in enumerate(ops))
+            return
+        for i, (key, value) in enumerate(ops):
+            versions = self.data.get(key, [])
+            # Keep the newest version the oldest snapshot can see, and everything after it
+            keep = 0
+            for j in range(len(versions) - 1, -1, -1):
+                if versions[j][0] <= oldest_snapshot:
+                    keep = j
+                    break
+            self.data[key] = versions[keep:] + [(first_sequence + i, value)]
+
+    def get(self, key, sequence=None):
+        versions = self.data.get(key)
+        return _visible(versions, sequence) if versions else None
+
+    def items(self, start=None, end=None, sequence=None):
+        """Yield (key, value) pairs visible at `sequence` with start <= key < end in sorted order."""
+        for key in self.data.irange(start, end, inclusive=(True, False)):
+            value = _visible(self.data[key], sequence)
+            if value is not None:
+                yield key, value
+
+    def is_full(self):
         return len(self.data) >= self.threshold
 
+    def discard(self):
+        """Drop the WAL once the memtable's contents are safely in an SSTable."""
+        self.wal.close()
+        if os.path.exists(self.wal.path):
+            os.remove(self.wal.path)
+
+class WriteBatch:
+    """Puts and deletes applied atomically by LSMTree.write."""
+
+    def __init__(self):
+        self.ops = []
+
+    def put(self, key, value):
+        self.ops.append((key, value))
+        return self
+
+    def delete(self, key):
+        self.ops.append((key, TOMBSTONE))
+        return self
+
+    def __len__(self):
+        return len(self.ops)
+
+class Snapshot:
+    """
+    A point-in-time view of the tree. The memtables and SSTables that existed when it
+    was taken stay pinned until release(); memtable entries newer than `sequence` are
+    ignored, so reads through it never observe later (or half-applied) writes.
+    """
+
+    def __init__(self, tree, sequence, memtable, immutables, levels):
+        self.tree = tree
+        self.sequence = sequence
+        self.memtable = memtable
+        self.immutables = immutables
+        self.levels = levels
+        self.released = False
+
     def get(self, key):
-        return self.data.get(key)
+        return self.tree.get(key, snapshot=self)
 
-    def clear(self):
-        self.data = SortedDict()
-        self.wal.close()
-        if os.path.exists("wal.log"):
-            os.remove("wal.log")
-        self.wal = open("wal.log", "a")
+    def scan(self, start=None, end=None, limit=None):
+        return self.tree.scan(start, end, limit, snapshot=self)
+
+    def release(self):
+        self.tree._release_snapshot(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
 
 class LSMTree:
-    def __init__(self, memtable_threshold, compaction_threshold=4):
-        self.memtable = MemTable(memtable_threshold)
-        self.sstables = []
+    def __init__(self, memtable_threshold, compaction_threshold=4, bloom_fp_rate=0.01, wal_mode=BUFFERED,
+                 max_immutable_memtables=2, l0_stall_threshold=None, compaction_strategy=None,
+                 target_file_size=2 * 1024 * 1024, compression=None, block_cache_bytes=8 * 1024 * 1024,
+                 filter_type="bloom", directory="."):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = Manifest(directory)
+        self.memtable_threshold = memtable_threshold
         self.compaction_threshold = compaction_threshold
+        self.bloom_fp_rate = bloom_fp_rate
+        self.wal_mode = wal_mode
+        self.compaction_strategy = compaction_strategy or LeveledCompaction(l0_trigger=compaction_threshold)
+        self.target_file_size = target_file_size
+        self.compression = compression
+        self.filter_type = filter_type  # per-SSTable filter: "bloom", "cuckoo" or "xor"
+        # Decoded blocks are shared across every SSTable of the tree
+        self.block_cache = BlockCache(block_cache_bytes)
+        # Back-pressure: writers stall only when the background worker falls this far behind
+        self.max_immutable_memtables = max_immutable_memtables
+        self.l0_stall_threshold = l0_stall_threshold or self.compaction_strategy.l0_stall_trigger
+
+        # Guards memtable, immutables, levels and SSTable reference counts
+        self.cond = threading.Condition()
+        self.next_file_number = 1
+        self.last_sequence = 0    # sequence number of the newest applied write
+        self.snapshots = []       # sequences of live snapshots
+        self.immutables = []  # full memtables waiting to be flushed, oldest first
+        # levels[0] holds flushed tables oldest first; deeper levels hold non-overlapping
+        # tables sorted by key. The lists are replaced wholesale, never mutated in place.
+        self.levels = [[]]
+        self._recover()
+        self.memtable = self._new_memtable()
+        with self.cond:
+            self._save_manifest()
+        self.compaction_lock = threading.Lock()
+        self.compaction_history = deque(maxlen=100)
+        self.bytes_flushed = 0
+        self.bytes_compacted_read = 0
+        self.bytes_compacted_written = 0
+        self.background_error = None
+        self.closing = False
+        self.worker = threading.Thread(target=self._background_loop, daemon=True)
+        self.worker.start()
+        self._migrate_legacy_files()
+
+    def _recover(self):
+        """Reopen the SSTables listed in the manifest and replay WALs that were never flushed."""
+        state = self.manifest.load() or {"next_file_number": 1, "log_number": 0, "levels": [[]]}
+        live_sstables = {name for level in state["levels"] for name in level}
+
+        numbers = []
+        wal_numbers = []
+        for name in os.listdir(self.directory):
+            match = FILE_NAME.match(name)
+            if not match or (match.group(1) == "wal") != (match.group(3) == "log"):
+                continue  # not ours, e.g. a legacy sstable_<timestamp>.log; see _migrate_legacy_files
+            kind, number = match.group(1), int(match.group(2))
+            numbers.append(number)
+            if kind == "wal" and number >= state["log_number"]:
+                wal_numbers.append(number)
+            elif kind == "wal" or name not in live_sstables:
+                # Already flushed WALs, and outputs of a flush/compaction that never reached the manifest
+                os.remove(self._path(name))
+        self.next_file_number = max([state["next_file_number"]] + [number + 1 for number in numbers])
+
+        self.levels = [[self._open_sstable(self._path(name)) for name in level] for level in state["levels"]]
+        # Recovered WALs become immutable memtables and are flushed in the background,
+        # so startup only costs one sequential read of the unflushed log.
+        for number in sorted(wal_numbers):
+            memtable = MemTable(self.memtable_threshold, self._path(f"wal_{number:06d}.log"), self.wal_mode, number)
+            self.last_sequence = memtable.replay(self.last_sequence)
+            if memtable.data:
+                self.immutables.append(memtable)
+            else:
+                memtable.discard()
+
+    def _migrate_legacy_files(self):
+        """
+        Import the data of a store written before the manifest existed, then delete its files.
+
+        The old store's table order only lived in memory, so tables are applied by flush time,
+        a compacted table after plain ones of the same second, and wal.log last. Files are
+        deleted oldest first once everything is on disk: if that is interrupted, the next start
+        re-applies only the newest tables, which leaves every key at its newest value.
+        """
+        legacy = []
+        for name in os.listdir(self.directory):
+            match = LEGACY_SSTABLE.match(name)
+            if match:
+                legacy.append(((int(match.group(1)), bool(match.group(2))), name))
+        legacy.sort()
+        names = [name for _, name in legacy]
+        if os.path.exists(self._path(LEGACY_WAL)):
+            names.append(LEGACY_WAL)
+        if not names:
+            return
+
+        for name in names:
+            batch = WriteBatch()
+            with open(self._path(name), "r") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        if name == LEGACY_WAL:
+                            break  # torn final line of the old WAL
+                        raise
+                    batch.put(entry["key"], entry["value"])
+                    if len(batch) >= self.memtable_threshold:
+                        self.write(batch)
+                        batch = WriteBatch()
+            self.write(batch)
+        self.flush()
+        if self.background_error:
+            raise RuntimeError("could not flush data migrated from legacy files") from self.background_error
+
+        for name in names:
+            os.remove(self._path(name))
+            bloom_path = self._path(name[:-len(".log")] + ".bf")
+            if name != LEGACY_WAL and os.path.exists(bloom_path):
+                os.remove(bloom_path)
+
+    def _save_manifest(self):
+        # Called with self.cond held, before any file the previous manifest refers to is deleted
+        log_number = (self.immutables[0] if self.immutables else self.memtable).number
+        levels = [[os.path.basename(sstable.path) for sstable in level] for level in self.levels]
+        self.manifest.save(self.next_file_number, log_number, levels)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _file_number(self):
+        number = self.next_file_number
+        self.next_file_number += 1
+        return number
+
+    def _new_sstable_path(self):
+        with self.cond:
+            return self._path(f"sstable_{self._file_number():06d}.sst")
+
+    def _new_writer(self, expected_keys):
+        return SSTableWriter(self._new_sstable_path(), expected_keys, fp_rate=self.bloom_fp_rate,
+                             compression=self.compression, filter_type=self.filter_type)
+
+    def _open_sstable(self, path):
+        return SSTable(path, self.block_cache)
+
+    def _new_memtable(self):
+        number = self._file_number()
+        return MemTable(self.memtable_threshold, self._path(f"wal_{number:06d}.log"), self.wal_mode, number)
 
     def set(self, key, value):
-        if self.memtable.set(key, value):
-            self.flush()
+        self._write([(key, value)])
 
     def delete(self, key):
-        self.set(key, TOMBSTONE)
+        self._write([(key, TOMBSTONE)])
 
-    def get(self, key):
-        value = self.memtable.get(key)
+    def write(self, batch):
+        """Apply a WriteBatch atomically: one WAL record, one memtable pass, one flush check."""
+        if batch.ops:
+            self._write(batch.ops)
+
+    def _write(self, ops):
+        with self.cond:
+            self._make_room_for_write()
+            memtable = self.memtable
+            oldest_snapshot = min(self.snapshots) if self.snapshots else None
+            seq = memtable.apply(ops, self.last_sequence + 1, oldest_snapshot)
+            # Publishing the new sequence last makes the whole batch visible at once
+            self.last_sequence += len(ops)
+            if memtable.is_full():
+                self._rotate_memtable()
+        # Wait for the WAL outside the lock so concurrent writers share one commit
+        try:
+            memtable.wal.wait(seq)
+        except BaseException as e:
+            # The batch is already readable in the memtable but is not in the WAL. Stop the
+            # tree rather than flush it to an SSTable after the caller was told it failed;
+            # on restart, replaying the WAL leaves it out.
+            with self.cond:
+                if self.background_error is None:
+                    self.background_error = e
+                self.cond.notify_all()
+            raise
+
+    def _make_room_for_write(self):
+        while True:
+            if self.background_error:
+                raise RuntimeError("LSM tree stopped after a failed WAL write, flush or compaction") \
+                    from self.background_error
+            if (len(self.immutables) < self.max_immutable_memtables and
+                    len(self.levels[0]) < self.l0_stall_threshold):
+                return
+            self.cond.wait()
+
+    def _rotate_memtable(self):
+        # Called with self.cond held
+        self.immutables.append(self.memtable)
+        self.memtable = self._new_memtable()
+        self.cond.notify_all()
+
+    def snapshot(self):
+        """Take a consistent point-in-time view; call release() (or use `with`) when done."""
+        with self.cond:
+            levels = self.levels
+            for level in levels:
+                for sstable in level:
+                    sstable.refs += 1
+            self.snapshots.append(self.last_sequence)
+            return Snapshot(self, self.last_sequence, self.memtable, list(self.immutables), levels)
+
+    def _release_snapshot(self, snapshot):
+        with self.cond:
+            if snapshot.released:
+                return
+            snapshot.released = True
+            self.snapshots.remove(snapshot.sequence)
+        self._release([sstable for level in snapshot.levels for sstable in level])
+
+    def _release(self, sstables):
+        dead = []
+        with self.cond:
+            for sstable in sstables:
+                sstable.refs -= 1
+                if sstable.refs == 0:
+                    dead.append(sstable)
+        for sstable in dead:
+            sstable.close()
+            os.remove(sstable.path)
+
+    def get(self, key, snapshot=None):
+        if snapshot is None:
+            # A plain read sees the latest state. Registering a snapshot for it would make
+            # writers keep old versions, so it only pins the SSTables that may hold the key.
+            with self.cond:
+                for table in [self.memtable] + self.immutables[::-1]:
+                    value = table.get(key)
+                    if value is not None:
+                        return value if value != TOMBSTONE else None
+                candidates = self._candidate_sstables(self.levels, key)
+                for sstable in candidates:
+                    sstable.refs += 1
+            try:
+                return self._get_from_sstables(key, candidates)
+            finally:
+                self._release(candidates)
+
+        # Writers keep mutating the active memtable's structure, so read it under the lock
+        with self.cond:
+            value = snapshot.memtable.get(key, snapshot.sequence)
         if value is not None:
             return value if value != TOMBSTONE else None
-        for sstable_path, bf_path in reversed(self.sstables):
-            with open(bf_path, 'r') as f:
-                bit_array = json.load(f)
-            bf = BloomFilter(len(bit_array))
-            bf.bit_array = bit_array
-
-            if bf.check(key)[0]:
-                with open(sstable_path, "r") as f:
-                    for line in f:
-                        entry = json.loads(line)
-                        if entry["key"] == key:
-                            return entry["value"] if entry["value"] != TOMBSTONE else None
+        for table in snapshot.immutables[::-1]:
+            value = table.get(key, snapshot.sequence)
+            if value is not None:
+                return value if value != TOMBSTONE else None
+        return self._get_from_sstables(key, self._candidate_sstables(snapshot.levels, key))
+
+    @staticmethod
+    def _candidate_sstables(levels, key):
+        """The SSTables that may hold `key`, newest first."""
+        candidates = list(reversed(levels[0]))
+        for level in levels[1:]:
+            # Tables below L0 don't overlap, so at most one per level can hold the key
+            i = bisect.bisect_left(level, key, key=lambda sstable: sstable.largest_key)
+            if i < len(level) and level[i].smallest_key <= key:
+                candidates.append(level[i])
+        return candidates
+
+    @staticmethod
+    def _get_from_sstables(key, candidates):
+        # SSTable.get consults the table's resident Bloom filter before touching any block
+        for sstable in candidates:
+            found, value = sstable.get(key)
+            if found:
+                return value if value != TOMBSTONE else None
         return None
 
+    def scan(self, start=None, end=None, limit=None, snapshot=None):
+        """
+        Lazily yield live (key, value) pairs with start <= key < end in key order.
+
+        The memtables and every SSTable are merged through a heap with the newest
+        version of each key winning; tombstoned keys are skipped.
+        """
+        snap = snapshot or self.snapshot()
+        try:
+            # Writers keep mutating the active memtable, so copy its (bounded) range;
+            # immutable memtables and SSTables are read lazily.
+            with self.cond:
+                active = list(snap.memtable.items(start, end, snap.sequence))
+            sources = [iter(active)] + [table.items(start, end, snap.sequence) for table in reversed(snap.immutables)]
+            sources += [sstable.items(start) for sstable in reversed(snap.levels[0])]
+            sources += [self._level_items(level, start) for level in snap.levels[1:]]
+
+            count = 0
+            for key, value in merge_iterators(sources):
+                if end is not None and key >= end:
+                    break
+                if value == TOMBSTONE:
+                    continue
+                yield key, value
+                count += 1
+                if limit is not None and count >= limit:
+                    break
+        finally:
+            if snapshot is None:
+                snap.release()
+
+    def prefix(self, prefix, start=None, limit=None):
+        """Lazily yield live (key, value) pairs whose key starts with `prefix` (resuming at `start`)."""
+        count = 0
+        for key, value in self.scan(start=max(prefix, start or prefix)):
+            if not key.startswith(prefix) or (limit is not None and count >= limit):
+                break
+            yield key, value
+            count += 1
+
+    def _level_items(self, level, start):
+        # Tables below L0 don't overlap, so a level reads as one sorted run
+        i = 0
+        if start is not None:
+            i = bisect.bisect_left(level, start, key=lambda sstable: sstable.largest_key)
+        for sstable in level[i:]:
+            yield from sstable.items(start)
+
+    def tables(self, snapshot):
+        """
+        Return [(name, items)] for every table in `snapshot`: the memtables, then each
+        level's SSTables. `items(start)` yields that table's raw entries (tombstones
+        included) from `start` on, as of the snapshot.
+        """
+        def memtable_items(table):
+            def items(start=None):
+                if table is snapshot.memtable:
+                    # Copy the active memtable's range under the lock; it is bounded by the threshold
+                    with self.cond:
+                        return iter(list(table.items(start, None, snapshot.sequence)))
+                return table.items(start, None, snapshot.sequence)
+            return items
+
+        tables = [(table.name, memtable_items(table)) for table in [snapshot.memtable] + snapshot.immutables[::-1]]
+        tables += [(os.path.basename(sstable.path), sstable.items) for level in snapshot.levels for sstable in level]
+        return tables
+
+    def compaction_stats(self):
+        """Cumulative and recent per-compaction I/O, for choosing a compaction strategy."""
+        with self.cond:
+            written = self.bytes_flushed + self.bytes_compacted_written
+            return {
+                "strategy": self.compaction_strategy.name,
+                "bytes_flushed": self.bytes_flushed,
+                "bytes_compacted_read": self.bytes_compacted_read,
+                "bytes_compacted_written": self.bytes_compacted_written,
+                "write_amplification": round(written / self.bytes_flushed, 3) if self.bytes_flushed else 0.0,
+                "level_bytes": [sum(sstable.size for sstable in level) for level in self.levels],
+                "recent": [stats.to_dict() for stats in self.compaction_history],
+            }
+
     def flush(self):
-        timestamp = int(time.time())
-        sstable_path = f"sstable_{timestamp}.log"
-        bf_path = f"sstable_{timestamp}.bf"
-        
-        bf = BloomFilter(size=1000) # Adjust size as needed
-        with open(sstable_path, "w") as f:
-            for key, value in self.memtable.data.items():
-                f.write(json.dumps({"key": key, "value": value}) + "\n")
-                bf.add(key)
-
-        with open(bf_path, 'w') as f:
-            json.dump(bf.bit_array, f)
-
-        self.sstables.append((sstable_path, bf_path))
-        self.memtable.clear()
-        if len(self.sstables) >= self.compaction_threshold:
-            self.compact()
+        """Rotate the active memtable and wait until every immutable memtable is on disk."""
+        with self.cond:
+            if self.memtable.data:
+                self._rotate_memtable()
+            while self.immutables and not self.background_error:
+                self.cond.wait()
+
+    def _needs_compaction(self):
+        return self.compaction_strategy.pick(self.levels) is not None
+
+    def _background_loop(self):
+        while True:
+            with self.cond:
+                while (not self.immutables and not self._needs_compaction() and not self.closing and
+                       not self.background_error):
+                    self.cond.wait()
+                if self.background_error or (self.closing and not self.immutables):
+                    return
+                memtable = self.immutables[0] if self.immutables else None
+            try:
+                if memtable is not None:
+                    self._flush_memtable(memtable)
+                else:
+                    self.compact()
+            except Exception as e:
+                with self.cond:
+                    self.background_error = e
+                    self.cond.notify_all()
+                return
+
+    def _flush_memtable(self, memtable):
+        # The memtable is immutable now, so it can be written without holding the lock
+        sstable_path = self._new_sstable_path()
+        write_sstable(sstable_path, memtable.items(), len(memtable.data), fp_rate=self.bloom_fp_rate,
+                      compression=self.compression, filter_type=self.filter_type)
+        sstable = self._open_sstable(sstable_path)
+
+        with self.cond:
+            if self.background_error:
+                # A write into this memtable may have failed its WAL commit meanwhile
+                sstable.close()
+                os.remove(sstable_path)
+                return
+            self.levels = [self.levels[0] + [sstable]] + self.levels[1:]
+            self.bytes_flushed += sstable.size
+            self.immutables.remove(memtable)
+            self._save_manifest()
+            self.cond.notify_all()
+        memtable.discard()
 
     def compact(self):
-        sstables_to_compact = self.sstables[:self.compaction_threshold]
-        remaining_sstables = self.sstables[self.compaction_threshold:]
+        """Run one compaction picked by the strategy; returns its stats, or None if nothing to do."""
+        with self.compaction_lock:
+            with self.cond:
+                compaction = self.compaction_strategy.pick(self.levels)
+            if compaction is None:
+                return None
 
-        merged_data = {}
-        for sstable_path, _ in sstables_to_compact:
-            with open(sstable_path, "r") as f:
-                for line in f:
-                    entry = json.loads(line)
-                    merged_data[entry["key"]] = entry["value"]
-        
-        timestamp = int(time.time())
-        new_sstable_path = f"sstable_{timestamp}_compacted.log"
-        new_bf_path = f"sstable_{timestamp}_compacted.bf"
-
-        bf = BloomFilter(size=1000) # Adjust size as needed
-        with open(new_sstable_path, "w") as f:
-            for key, value in sorted(merged_data.items()):
-                if value != TOMBSTONE:
-                    f.write(json.dumps({"key": key, "value": value}) + "\n")
-                    bf.add(key)
-
-        with open(new_bf_path, 'w') as f:
-            json.dump(bf.bit_array, f)
-
-        for sstable_path, bf_path in sstables_to_compact:
-            os.remove(sstable_path)
-            os.remove(bf_path)
-            
-        self.sstables = remaining_sstables + [(new_sstable_path, new_bf_path)]
+            # Only this thread removes tables and flushes only append to L0, so the
+            # picked inputs stay valid while they are merged without the lock.
+            outputs, stats = compaction.run(self._new_writer, self._open_sstable, self.target_file_size)
+
+            with self.cond:
+                self.levels = compaction.install(self.levels, outputs)
+                self._save_manifest()
+                self.bytes_compacted_read += stats.bytes_read
+                self.bytes_compacted_written += stats.bytes_written
+                self.compaction_history.append(stats)
+                self.cond.notify_all()
+            # Drop the tree's reference; files are deleted once no reader has them pinned
+            self._release([sstable for _, sstable in compaction.inputs])
+            return stats
+
+    def close(self):
+        """Flush pending immutable memtables, stop the background worker and close all files."""
+        with self.cond:
+            self.closing = True
+            self.cond.notify_all()
+        self.worker.join()
+        # Immutable memtables are only left over if the worker stopped on an error
+        for table in [self.memtable] + self.immutables:
+            table.wal.close()
+        for level in self.levels:
+            for sstable in level:
+                sstable.close()
+
+    def destroy(self):
+        """Close the tree and delete every file it owns."""
+        self.close()
+        for table in [self.memtable] + self.immutables:
+            table.discard()
+        for level in self.levels:
+            for sstable in level:
+                os.remove(sstable.path)
+        self.manifest.remove()
@@ -0,0 +1,159 @@
+import argparse
+import os
+import random
+import shutil
+import string
+import tempfile
+import time
+
+from compaction import STRATEGIES
+from lsm import LSMTree
+from sstable import FILTER_TYPES
+from wal import MODES, BUFFERED
+
+BENCHMARKS = ("fillseq", "fillrandom", "readrandom", "readmissing", "overwrite", "deleterandom", "scan")
+
+class Workload:
+    """Generates keys and values for the db_bench-style workloads."""
+
+    def __init__(self, num, key_size, value_size, seed):
+        self.num = num
+        self.key_size = key_size
+        self.rng = random.Random(seed)
+        # A pool of random values, so value generation stays out of the measured loop
+        alphabet = string.ascii_letters + string.digits
+        self.values = ["".join(self.rng.choices(alphabet, k=value_size)) for _ in range(1024)]
+
+    def key(self, i):
+        return str(i).zfill(self.key_size)
+
+    def missing_key(self, i):
+        # Same prefix as a real key but never written
+        return self.key(i) + "."
+
+    def value(self):
+        return self.values[self.rng.randrange(len(self.values))]
+
+    def random_index(self):
+        return self.rng.randrange(self.num)
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+def run_benchmark(name, tree, workload, reads, scan_length):
+    """Run one workload and return (ops, elapsed seconds, per-op latencies in microseconds)."""
+    latencies = []
+    clock = time.perf_counter_ns
+    ops = 0
+    start = time.perf_counter()
+
+    if name in ("fillseq", "fillrandom", "overwrite"):
+        for i in range(workload.num):
+            key = workload.key(i if name == "fillseq" else workload.random_index())
+            value = workload.value()
+            t0 = clock()
+            tree.set(key, value)
+            latencies.append((clock() - t0) / 1000)
+        ops = workload.num
+    elif name == "deleterandom":
+        for _ in range(workload.num):
+            key = workload.key(workload.random_index())
+            t0 = clock()
+            tree.delete(key)
+            latencies.append((clock() - t0) / 1000)
+        ops = workload.num
+    elif name in ("readrandom", "readmissing"):
+        for _ in range(reads):
+            i = workload.random_index()
+            key = workload.key(i) if name == "readrandom" else workload.missing_key(i)
+            t0 = clock()
+            tree.get(key)
+            latencies.append((clock() - t0) / 1000)
+        ops = reads
+    elif name == "scan":
+        # One op is one scan of up to scan_length keys from a random start
+        for _ in range(max(1, reads // scan_length)):
+            start_key = workload.key(workload.random_index())
+            t0 = clock()
+            for _ in tree.scan(start_key, limit=scan_length):
+                pass
+            latencies.append((clock() - t0) / 1000)
+            ops += 1
+
+    return ops, time.perf_counter() - start, latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="db_bench-style workloads for LSMTree.")
+    parser.add_argument("--benchmarks", default="fillseq,fillrandom,readrandom,readmissing,overwrite,deleterandom,scan",
+                        help=f"comma-separated list from: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--num", type=int, default=100000, help="number of keys written by each write workload")
+    parser.add_argument("--reads", type=int, default=None, help="number of reads (defaults to --num)")
+    parser.add_argument("--key-size", type=int, default=16)
+    parser.add_argument("--value-size", type=int, default=100)
+    parser.add_argument("--scan-length", type=int, default=100)
+    parser.add_argument("--memtable-threshold", type=int, default=10000, help="keys per memtable")
+    parser.add_argument("--compaction-threshold", type=int, default=4, help="L0 tables that trigger compaction")
+    parser.add_argument("--compaction-strategy", choices=sorted(STRATEGIES), default="leveled")
+    parser.add_argument("--target-file-size", type=int, default=2 * 1024 * 1024)
+    parser.add_argument("--compression", choices=["none", "zlib", "lzma"], default="none")
+    parser.add_argument("--filter", choices=sorted(FILTER_TYPES), default="bloom", help="per-SSTable filter")
+    parser.add_argument("--block-cache-bytes", type=int, default=8 * 1024 * 1024)
+    parser.add_argument("--wal-mode", choices=MODES, default=BUFFERED)
+    parser.add_argument("--db", default=None, help="database directory (defaults to a temporary one)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    benchmarks = [name.strip() for name in args.benchmarks.split(",") if name.strip()]
+    for name in benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name!r}")
+
+    directory = args.db or tempfile.mkdtemp(prefix="lsm_bench_")
+    strategy_class = STRATEGIES[args.compaction_strategy]
+    if args.compaction_strategy == "leveled":
+        strategy = strategy_class(l0_trigger=args.compaction_threshold)
+    else:
+        strategy = strategy_class(min_threshold=args.compaction_threshold)
+    tree = LSMTree(
+        args.memtable_threshold,
+        compaction_threshold=args.compaction_threshold,
+        compaction_strategy=strategy,
+        target_file_size=args.target_file_size,
+        compression=None if args.compression == "none" else args.compression,
+        filter_type=args.filter,
+        block_cache_bytes=args.block_cache_bytes,
+        wal_mode=args.wal_mode,
+        directory=directory,
+    )
+    workload = Workload(args.num, args.key_size, args.value_size, args.seed)
+    reads = args.reads if args.reads is not None else args.num
+
+    print(f"keys: {args.key_size} bytes, values: {args.value_size} bytes, memtable: {args.memtable_threshold} keys, "
+          f"compaction: {strategy.name}, compression: {args.compression}, filter: {args.filter}, wal: {args.wal_mode}")
+    print(f"{'benchmark':<13} {'ops/sec':>11} {'p50 us':>9} {'p99 us':>9} {'p99.9 us':>9} {'max us':>10} "
+          f"{'write amp':>9} {'disk MB':>9}")
+    try:
+        for name in benchmarks:
+            ops, elapsed, latencies = run_benchmark(name, tree, workload, reads, args.scan_length)
+            latencies.sort()
+            stats = tree.compaction_stats()
+            print(f"{name:<13} {ops / elapsed:>11,.0f} {percentile(latencies, 50):>9.1f} "
+                  f"{percentile(latencies, 99):>9.1f} {percentile(latencies, 99.9):>9.1f} "
+                  f"{latencies[-1] if latencies else 0:>10.1f} {stats['write_amplification']:>9.2f} "
+                  f"{directory_size(directory) / (1024 * 1024):>9.2f}")
+        cache = tree.block_cache.stats()
+        print(f"block cache: hit rate {cache['hit_rate']:.2%}, {cache['evictions']} evictions")
+    finally:
+        if args.db:
+            tree.close()
+        else:
+            tree.destroy()
+            shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import json
+import os
+
+MANIFEST_NAME = "MANIFEST"
+
+class Manifest:
+    """
+    Durable record of the tree's shape: the live SSTables in each level, the next
+    file number to hand out, and the oldest WAL that still holds unflushed writes.
+
+    The whole state is rewritten on every change (it only lists file names) and
+    swapped in with an atomic rename, so a crash leaves either the old or the new version.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_NAME)
+
+    def load(self):
+        """Return the saved state as a dict, or None for a fresh directory."""
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def save(self, next_file_number, log_number, levels):
+        state = {
+            "next_file_number": next_file_number,
+            "log_number": log_number,
+            "levels": levels,
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        # Make the rename itself durable
+        dir_fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,9 +1,16 @@
-from fastapi import FastAPI
+import base64
+import binascii
+import heapq
+import json
+from itertools import islice
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from lsm import LSMTree
-import json
-import os
+from starlette.concurrency import run_in_threadpool
+from lsm import LSMTree, WriteBatch
 
 app = FastAPI()
 
@@ -39,23 +46,145 @@ def get_key(key: str):
     value = lsm_tree.get(key)
     return {"key": key, "value": value}
 
+def parse_batch_op(line, line_number):
+    try:
+        op = json.loads(line)
+        # Keys and values go into the WAL as UTF-8 text, so anything else is rejected here
+        # rather than failing halfway through the batch
+        if isinstance(op["key"], str):
+            if op["op"] == "set" and isinstance(op["value"], str):
+                return op["key"], op["value"]
+            if op["op"] == "delete":
+                return op["key"], None
+    except (ValueError, KeyError, TypeError):
+        pass
+    raise HTTPException(status_code=400, detail=f"Invalid operation on line {line_number}.")
+
+@app.post("/batch")
+async def write_batch(request: Request, batch_size: int = Query(1000, ge=1, le=100000)):
+    """
+    Applies a streamed NDJSON body of {"op": "set", "key", "value"} / {"op": "delete", "key"} lines.
+    Every `batch_size` operations are written as one atomic WriteBatch.
+    """
+    batch = WriteBatch()
+    applied = 0
+    line_number = 0
+    buffer = b""
+
+    async def flush_batch():
+        nonlocal batch, applied
+        if len(batch):
+            await run_in_threadpool(lsm_tree.write, batch)
+            applied += len(batch)
+            batch = WriteBatch()
+
+    async def add_line(line):
+        nonlocal line_number
+        line_number += 1
+        if not line.strip():
+            return
+        key, value = parse_batch_op(line, line_number)
+        if value is None:
+            batch.delete(key)
+        else:
+            batch.put(key, value)
+        if len(batch) >= batch_size:
+            await flush_batch()
+
+    try:
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                await add_line(line)
+        await add_line(buffer)
+        await flush_batch()
+    except HTTPException as e:
+        e.detail = f"{e.detail} {applied} operations were applied before it."
+        raise
+    return {"status": "ok", "applied": applied}
+
+def encode_cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position).encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.b64decode(cursor, altchars=b"-_", validate=True).decode("utf-8"))
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+@app.get("/scan")
+def scan_keys(start: Optional[str] = None, end: Optional[str] = None, prefix: Optional[str] = None,
+              limit: int = Query(100, ge=1, le=1000), cursor: Optional[str] = None):
+    """Returns one page of live keys in order; pass `next_cursor` back as `cursor` for the next page."""
+    if cursor is not None:
+        start = decode_cursor(cursor)
+        if not isinstance(start, str):
+            raise HTTPException(status_code=400, detail="Invalid cursor.")
+    if prefix is not None:
+        results = lsm_tree.prefix(prefix, start=start)
+    else:
+        results = lsm_tree.scan(start, end)
+    # Read one extra item to learn where the next page starts
+    page = list(islice(results, limit + 1))
+    results.close()
+    next_cursor = encode_cursor(page[limit][0]) if len(page) > limit else None
+    return {
+        "items": [{"key": key, "value": value} for key, value in page[:limit]],
+        "next_cursor": next_cursor,
+    }
+
 @app.get("/data")
-def get_data():
-    memtable_data = lsm_tree.memtable.data
-    sstables_data = []
-    for sstable_path, _ in lsm_tree.sstables:
-        with open(sstable_path, "r") as f:
-            data = [json.loads(line) for line in f]
-            sstables_data.append(data)
-    return {"memtable": memtable_data, "sstables": sstables_data}
+def get_data(limit: int = Query(1000, ge=1, le=10000), cursor: Optional[str] = None):
+    """
+    Streams one page of raw entries (tombstones included) as NDJSON {"table", "key", "value"}
+    lines in key order. A key's entries come in table order (the active memtable, the
+    immutable memtables, then every level's SSTables) and are never split across pages.
+    The last line is {"next_cursor": ..., "sequence": ...}: pass `next_cursor` back as `cursor`
+    for the next page. Each page is read from a single snapshot, whose sequence is reported.
+    """
+    start_key = None
+    if cursor is not None:
+        start_key = decode_cursor(cursor)
+        if not isinstance(start_key, str):
+            raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+    snapshot = lsm_tree.snapshot()
+    tables = lsm_tree.tables(snapshot)
+
+    def lines():
+        try:
+            # The cursor is a key, so it stays valid when the tables it was read from are
+            # flushed or compacted away between pages
+            sources = [((key, index, value) for key, value in items(start_key))
+                       for index, (_, items) in enumerate(tables)]
+            sent = 0
+            last_key = None
+            for key, index, value in heapq.merge(*sources):
+                if sent >= limit and key != last_key:
+                    yield json.dumps({"next_cursor": encode_cursor(key), "sequence": snapshot.sequence}) + "\n"
+                    return
+                yield json.dumps({"table": tables[index][0], "key": key, "value": value}) + "\n"
+                sent += 1
+                last_key = key
+            yield json.dumps({"next_cursor": None, "sequence": snapshot.sequence}) + "\n"
+        finally:
+            snapshot.release()
+
+    # release() is idempotent; the background task covers clients that disconnect before the first line
+    return StreamingResponse(lines(), media_type="application/x-ndjson", background=BackgroundTask(snapshot.release))
+
+@app.get("/stats")
+def get_stats():
+    return lsm_tree.compaction_stats()
+
+@app.get("/cache")
+def get_cache_stats():
+    return lsm_tree.block_cache.stats()
 
 @app.post("/clear")
 def clear_tree():
     global lsm_tree
-    for sstable_path, bf_path in lsm_tree.sstables:
-        os.remove(sstable_path)
-        os.remove(bf_path)
-    if os.path.exists("wal.log"):
-        os.remove("wal.log")
+    lsm_tree.destroy()
     lsm_tree = LSMTree(memtable_threshold=5)
     return {"status": "cleared"}
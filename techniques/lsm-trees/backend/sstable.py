@@ -0,0 +1,257 @@
+import bisect
+import itertools
+import lzma
+import mmap
+import struct
+import zlib
+from bloom import BloomFilter
+from cuckoo import CuckooFilter
+from xor_filter import XorFilter
+
+# On-disk layout of an SSTable:
+#
+#   [data block 0][data block 1]...[data block n][index block][filter block][footer]
+#
+# A data block holds sorted, length-prefixed records, stored behind a one-byte
+# compression type. The index block holds the first key of every data block
+# together with its offset and stored size, so a lookup only has to bisect the
+# index and decode a single block. The filter block is a one-byte filter type
+# followed by an approximate-membership filter (Bloom, cuckoo or xor) sized for
+# the keys in this table.
+BLOCK_SIZE = 4096
+BLOOM_FP_RATE = 0.01
+MAGIC = b"LSM2"
+LEGACY_MAGIC = b"LSMT"  # tables whose filter block is an untyped Bloom filter
+TOMBSTONE = "__TOMBSTONE__"
+
+RECORD_HEADER = struct.Struct("<II")     # key length, value length
+INDEX_ENTRY = struct.Struct("<IQI")      # key length, block offset, block size
+FOOTER = struct.Struct("<QQQQQ4s")       # index offset/size, filter offset/size, entry count, magic
+
+# Block compression types
+NO_COMPRESSION = 0
+ZLIB = 1
+LZMA = 2
+COMPRESSION_TYPES = {None: NO_COMPRESSION, "zlib": ZLIB, "lzma": LZMA}
+COMPRESSORS = {ZLIB: zlib.compress, LZMA: lzma.compress}
+DECOMPRESSORS = {ZLIB: zlib.decompress, LZMA: lzma.decompress}
+
+# Filter types
+BLOOM = 0
+CUCKOO = 1
+XOR = 2
+FILTER_TYPES = {"bloom": BLOOM, "cuckoo": CUCKOO, "xor": XOR}
+FILTERS = {BLOOM: BloomFilter, CUCKOO: CuckooFilter, XOR: XorFilter}
+
+# Distinguishes tables in the shared block cache, even if a file name is reused
+_table_ids = itertools.count()
+
+
+def _encode_record(key, value):
+    key_bytes = key.encode("utf-8")
+    value_bytes = value.encode("utf-8")
+    return RECORD_HEADER.pack(len(key_bytes), len(value_bytes)) + key_bytes + value_bytes
+
+
+def _decode_records(buf):
+    """Yield (key, value) pairs from an encoded data block."""
+    pos = 0
+    end = len(buf)
+    while pos < end:
+        key_len, value_len = RECORD_HEADER.unpack_from(buf, pos)
+        pos += RECORD_HEADER.size
+        key = buf[pos:pos + key_len].decode("utf-8")
+        pos += key_len
+        value = buf[pos:pos + value_len].decode("utf-8")
+        pos += value_len
+        yield key, value
+
+
+class SSTableWriter:
+    """Writes sorted key/value pairs into a new SSTable file."""
+
+    def __init__(self, path, expected_keys, block_size=BLOCK_SIZE, fp_rate=BLOOM_FP_RATE, compression=None,
+                 filter_type="bloom"):
+        if compression not in COMPRESSION_TYPES:
+            raise ValueError(f"unknown compression {compression!r}, expected one of {list(COMPRESSION_TYPES)}")
+        if filter_type not in FILTER_TYPES:
+            raise ValueError(f"unknown filter type {filter_type!r}, expected one of {list(FILTER_TYPES)}")
+        self.path = path
+        self.block_size = block_size
+        self.compression = COMPRESSION_TYPES[compression]
+        self.filter_type = FILTER_TYPES[filter_type]
+        self.fp_rate = fp_rate
+        # A Bloom filter is filled block by block; cuckoo and xor filters are built from
+        # every key at finish(), sized exactly for the table
+        self.filter = BloomFilter.for_capacity(expected_keys, fp_rate) if self.filter_type == BLOOM else None
+        self.keys = []
+        self.file = open(path, "wb")
+        self.offset = 0
+        self.block = bytearray()
+        self.block_first_key = None
+        self.block_keys = []  # added to the Bloom filter in one batch per block
+        self.last_key = None
+        self.index = []
+        self.count = 0
+
+    def add(self, key, value):
+        if self.last_key is not None and key <= self.last_key:
+            raise ValueError(f"keys must be added in sorted order: {key!r} after {self.last_key!r}")
+        if self.block_first_key is None:
+            self.block_first_key = key
+        self.block += _encode_record(key, value)
+        self.block_keys.append(key)
+        self.last_key = key
+        self.count += 1
+        if len(self.block) >= self.block_size:
+            self._finish_block()
+
+    def estimated_size(self):
+        return self.offset + len(self.block)
+
+    def _finish_block(self):
+        if not self.block:
+            return
+        if self.filter is not None:
+            self.filter.add_many(self.block_keys)
+        else:
+            self.keys += self.block_keys
+        self.block_keys = []
+        stored = bytes([NO_COMPRESSION]) + self.block
+        if self.compression != NO_COMPRESSION:
+            compressed = COMPRESSORS[self.compression](self.block)
+            # Keep the raw block when compression doesn't pay for itself
+            if len(compressed) < len(self.block):
+                stored = bytes([self.compression]) + compressed
+        self.file.write(stored)
+        self.index.append((self.block_first_key, self.offset, len(stored)))
+        self.offset += len(stored)
+        self.block = bytearray()
+        self.block_first_key = None
+
+    def finish(self):
+        self._finish_block()
+        index_offset = self.offset
+        index = bytearray()
+        for first_key, offset, size in self.index:
+            key_bytes = first_key.encode("utf-8")
+            index += INDEX_ENTRY.pack(len(key_bytes), offset, size) + key_bytes
+        self.file.write(index)
+        if self.filter is None:
+            self.filter = FILTERS[self.filter_type].build(self.keys, self.fp_rate)
+        filter_block = bytes([self.filter_type]) + self.filter.to_bytes()
+        self.file.write(filter_block)
+        self.file.write(FOOTER.pack(index_offset, len(index), index_offset + len(index), len(filter_block),
+                                    self.count, MAGIC))
+        self.file.close()
+        return self.path
+
+
+def write_sstable(path, items, expected_keys, block_size=BLOCK_SIZE, fp_rate=BLOOM_FP_RATE, compression=None,
+                  filter_type="bloom"):
+    """Write an iterable of sorted (key, value) pairs to `path`."""
+    writer = SSTableWriter(path, expected_keys, block_size, fp_rate, compression, filter_type)
+    for key, value in items:
+        writer.add(key, value)
+    return writer.finish()
+
+
+class SSTable:
+    """Read-only, memory-mapped view of an SSTable file."""
+
+    def __init__(self, path, block_cache=None):
+        self.path = path
+        self.id = next(_table_ids)
+        self.block_cache = block_cache
+        self.refs = 1  # the owning tree's reference; readers pin the table while using it
+        self.file = open(path, "rb")
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        footer = FOOTER.unpack_from(self.mm, len(self.mm) - FOOTER.size)
+        index_offset, index_size, filter_offset, filter_size, self.count, magic = footer
+        if magic not in (MAGIC, LEGACY_MAGIC):
+            raise ValueError(f"{path} is not an SSTable")
+
+        # The filter stays resident for the table's lifetime so negative lookups cost no I/O
+        filter_block = self.mm[filter_offset:filter_offset + filter_size]
+        if magic == LEGACY_MAGIC:
+            self.filter = BloomFilter.from_bytes(filter_block)
+        else:
+            self.filter = FILTERS[filter_block[0]].from_bytes(filter_block[1:])
+
+        # Sparse index: first key of every block, kept in parallel lists for bisect
+        self.first_keys = []
+        self.blocks = []
+        pos = index_offset
+        end = index_offset + index_size
+        while pos < end:
+            key_len, offset, size = INDEX_ENTRY.unpack_from(self.mm, pos)
+            pos += INDEX_ENTRY.size
+            self.first_keys.append(self.mm[pos:pos + key_len].decode("utf-8"))
+            pos += key_len
+            self.blocks.append((offset, size))
+
+        self.size = len(self.mm)
+        self.smallest_key = self.first_keys[0] if self.first_keys else None
+        self.largest_key = None
+        if self.blocks:
+            self.largest_key = self._block(len(self.blocks) - 1, fill_cache=False)[0][-1]
+
+    def _read_block(self, i):
+        offset, size = self.blocks[i]
+        compression = self.mm[offset]
+        stored = self.mm[offset + 1:offset + size]
+        if compression == NO_COMPRESSION:
+            return stored
+        return DECOMPRESSORS[compression](stored)
+
+    def _block(self, i, fill_cache=True):
+        """Return block i as parallel (keys, values) lists, going through the shared cache."""
+        cache_key = (self.id, i)
+        if self.block_cache is not None:
+            block = self.block_cache.get(cache_key)
+            if block is not None:
+                return block
+        raw = self._read_block(i)
+        keys = []
+        values = []
+        for key, value in _decode_records(raw):
+            keys.append(key)
+            values.append(value)
+        block = (keys, values)
+        if self.block_cache is not None and fill_cache:
+            self.block_cache.put(cache_key, block, len(raw))
+        return block
+
+    def overlaps(self, smallest, largest):
+        return self.count > 0 and not (self.largest_key < smallest or self.smallest_key > largest)
+
+    def may_contain(self, key):
+        return self.filter.check(key)[0]
+
+    def get(self, key):
+        """Return (found, value) for `key`, decoding at most one block."""
+        if not self.may_contain(key):
+            return False, None
+        i = bisect.bisect_right(self.first_keys, key) - 1
+        if i < 0:
+            return False, None
+        keys, values = self._block(i)
+        j = bisect.bisect_left(keys, key)
+        if j < len(keys) and keys[j] == key:
+            return True, values[j]
+        return False, None
+
+    def items(self, start=None, fill_cache=True):
+        """Yield (key, value) pairs with key >= start in sorted order, one block at a time."""
+        first = 0
+        if start is not None:
+            first = max(bisect.bisect_right(self.first_keys, start) - 1, 0)
+        for i in range(first, len(self.blocks)):
+            keys, values = self._block(i, fill_cache)
+            j = 0 if start is None else bisect.bisect_left(keys, start)
+            yield from zip(keys[j:], values[j:])
+
+    def close(self):
+        self.mm.close()
+        self.file.close()
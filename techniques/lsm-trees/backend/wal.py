@@ -0,0 +1,170 @@
+import os
+import struct
+import threading
+import zlib
+
+# Durability modes
+SYNC = "sync"          # every append waits for an fsync (concurrent appends share one)
+BATCH = "batch"        # a background thread fsyncs every sync_interval_ms or sync_bytes
+BUFFERED = "buffered"  # appends are written to the OS page cache, never fsynced
+
+MODES = (SYNC, BATCH, BUFFERED)
+
+# Record layout: crc32 of the body, body length, body. The body is a batch of
+# entries (key length, value length, key, value) that is replayed all or nothing.
+RECORD_HEADER = struct.Struct("<II")
+ENTRY_HEADER = struct.Struct("<II")
+
+
+def encode_record(ops):
+    body = bytearray()
+    for key, value in ops:
+        key_bytes = key.encode("utf-8")
+        value_bytes = value.encode("utf-8")
+        body += ENTRY_HEADER.pack(len(key_bytes), len(value_bytes)) + key_bytes + value_bytes
+    return RECORD_HEADER.pack(zlib.crc32(body), len(body)) + body
+
+
+def read_records(path):
+    """Yield one list of (key, value) pairs per record, stopping at the first torn or corrupt record."""
+    if not os.path.exists(path):
+        return
+    # Stream record by record so replay memory is bounded by the largest batch, not the log
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            crc, body_len = RECORD_HEADER.unpack(header)
+            body = f.read(body_len)
+            if len(body) < body_len or zlib.crc32(body) != crc:
+                return
+            ops = []
+            pos = 0
+            while pos < body_len:
+                key_len, value_len = ENTRY_HEADER.unpack_from(body, pos)
+                pos += ENTRY_HEADER.size
+                ops.append((body[pos:pos + key_len].decode("utf-8"),
+                            body[pos + key_len:pos + key_len + value_len].decode("utf-8")))
+                pos += key_len + value_len
+            yield ops
+
+
+class WriteAheadLog:
+    """
+    Append-only log that batches concurrent appends into a single write (group commit).
+
+    A failed write or fsync leaves the log in an unknown state (part of a batch may be on
+    disk, and the kernel may have dropped the dirty pages), so the WAL stops there: the
+    records of that batch are never reported as committed, and every waiting and later
+    append raises instead.
+    """
+
+    def __init__(self, path, mode=BUFFERED, sync_interval_ms=10, sync_bytes=1 << 20):
+        if mode not in MODES:
+            raise ValueError(f"unknown WAL mode {mode!r}, expected one of {MODES}")
+        self.path = path
+        self.mode = mode
+        self.sync_interval = sync_interval_ms / 1000
+        self.sync_bytes = sync_bytes
+        self.file = open(path, "ab", buffering=0)
+
+        self.cond = threading.Condition()
+        self.pending = bytearray()
+        self.appended_seq = 0    # number of records handed to append()
+        self.committed_seq = 0   # number of records written (and fsynced, if the mode asks for it)
+        self.leader_active = False
+        self.closed = False
+        self.error = None        # exception from the failed write or fsync, once there is one
+
+        self.syncer = None
+        if mode == BATCH:
+            self.syncer = threading.Thread(target=self._sync_loop, daemon=True)
+            self.syncer.start()
+
+    def append(self, ops):
+        self.wait(self.enqueue(ops))
+
+    def enqueue(self, ops):
+        """Queue one record of (key, value) ops without waiting for it to be written; returns its sequence for wait()."""
+        record = encode_record(ops)
+        with self.cond:
+            if self.closed:
+                raise ValueError("append to a closed WAL")
+            self._check_failed()
+            self.pending += record
+            self.appended_seq += 1
+            if self.mode == BATCH and len(self.pending) >= self.sync_bytes:
+                self.cond.notify_all()
+            return self.appended_seq
+
+    def wait(self, seq):
+        """Block until record `seq` is as durable as the mode promises."""
+        if self.mode == BATCH:
+            return
+        with self.cond:
+            self._commit(seq, fsync=self.mode == SYNC)
+
+    def _check_failed(self):
+        if self.error is not None:
+            raise OSError(f"WAL is unusable after a failed write: {self.error}") from self.error
+
+    def _commit(self, seq, fsync):
+        # Called with self.cond held. The first waiter becomes the leader and writes
+        # everything pending on behalf of the others; followers just wait for it.
+        while self.committed_seq < seq:
+            self._check_failed()
+            if self.leader_active:
+                self.cond.wait()
+                continue
+            self.leader_active = True
+            batch, self.pending = self.pending, bytearray()
+            batch_seq = self.appended_seq
+            self.cond.release()
+            try:
+                self.file.write(batch)
+                if fsync:
+                    os.fsync(self.file.fileno())
+            except BaseException as exc:
+                self.cond.acquire()
+                self.leader_active = False
+                # committed_seq stays put: followers wake up to the error, not to success
+                self.error = exc
+                self.cond.notify_all()
+                raise
+            self.cond.acquire()
+            self.leader_active = False
+            self.committed_seq = batch_seq
+            self.cond.notify_all()
+
+    def _sync_loop(self):
+        with self.cond:
+            while not self.closed:
+                self.cond.wait(self.sync_interval)
+                if self.pending:
+                    try:
+                        self._commit(self.appended_seq, fsync=True)
+                    except OSError:
+                        return  # recorded in self.error; appends now raise it
+
+    def sync(self):
+        """Write and fsync everything appended so far."""
+        with self.cond:
+            self._commit(self.appended_seq, fsync=False)
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        with self.cond:
+            if self.closed:
+                return
+            # No appends from here on; the syncer exits once it wakes
+            self.closed = True
+            self.cond.notify_all()
+        try:
+            with self.cond:
+                if self.error is None:
+                    self._commit(self.appended_seq, fsync=self.mode != BUFFERED)
+        finally:
+            if self.syncer:
+                self.syncer.join()
+            self.file.close()
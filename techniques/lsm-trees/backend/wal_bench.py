@@ -0,0 +1,45 @@
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from wal import WriteAheadLog, MODES
+
+def run(mode, threads, writes_per_thread, value_size, sync_interval_ms, sync_bytes):
+    """Append from `threads` concurrent writers and return writes/sec for one WAL mode."""
+    value = "v" * value_size
+    with tempfile.TemporaryDirectory() as tmp:
+        wal = WriteAheadLog(os.path.join(tmp, "wal.log"), mode, sync_interval_ms, sync_bytes)
+
+        def writer(thread_id):
+            for i in range(writes_per_thread):
+                wal.append([(f"key-{thread_id}-{i}", value)])
+
+        workers = [threading.Thread(target=writer, args=(t,)) for t in range(threads)]
+        start = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        wal.close()
+        elapsed = time.perf_counter() - start
+    return threads * writes_per_thread / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure WAL append throughput for each durability mode.")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=2000, help="writes per thread")
+    parser.add_argument("--value-size", type=int, default=100)
+    parser.add_argument("--sync-interval-ms", type=int, default=10)
+    parser.add_argument("--sync-bytes", type=int, default=1 << 20)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    print(f"{'mode':<10} {'writes/sec':>12}")
+    for mode in args.modes:
+        rate = run(mode, args.threads, args.writes, args.value_size, args.sync_interval_ms, args.sync_bytes)
+        print(f"{mode:<10} {rate:>12,.0f}")
+
+if __name__ == "__main__":
+    main()
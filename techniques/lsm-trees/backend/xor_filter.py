@@ -0,0 +1,125 @@
+import math
+import struct
+import mmh3
+import numpy as np
+from packed import PackedArray
+
+XOR_HEADER = struct.Struct("<QII")  # segment length, fingerprint bits, seed
+MAX_SEEDS = 100
+
+def _hash_words(item, seed):
+    # Four 32-bit words from one 128-bit murmur3 hash: three slot hashes and the fingerprint
+    return struct.unpack("<4I", mmh3.hash_bytes(str(item).encode(), seed))
+
+class XorFilter:
+    """
+    Static xor filter (Graf & Lemire, 2020), built once from a key set.
+
+    Every key maps to one slot in each of three segments, and the slots are filled
+    so that their xor equals the key's fingerprint. A lookup reads three slots;
+    the table takes about 1.23 * f bits per key for a 2^-f false-positive rate.
+    Items cannot be added or removed after build().
+    """
+
+    def __init__(self, segment_length, fingerprint_bits, seed):
+        self.segment_length = segment_length
+        self.fingerprint_bits = fingerprint_bits
+        self.seed = seed
+        self.fingerprints = PackedArray(3 * segment_length, fingerprint_bits)
+
+    @classmethod
+    def build(cls, items, fp_rate=0.01):
+        """Build a filter holding `items`; f = log2(1 / fp_rate) bits per fingerprint."""
+        fingerprint_bits = min(32, max(1, int(math.ceil(math.log2(1 / fp_rate)))))
+        keys = list(dict.fromkeys(str(item) for item in items))
+        n = len(keys)
+        segment_length = max(1, int(math.ceil((1.23 * n + 32) / 3)))
+        capacity = 3 * segment_length
+
+        for seed in range(MAX_SEEDS):
+            xf = cls(segment_length, fingerprint_bits, seed)
+            words = xf._words_many(keys)
+            slots = xf._slots(words)
+            order = xf._peel(slots, capacity)
+            if order is not None:
+                break
+        else:
+            raise ValueError("could not build xor filter; are there duplicate keys?")
+
+        # Assign slots in reverse peeling order: each key's own slot is the last of its three to be set
+        mask = (1 << fingerprint_bits) - 1
+        fingerprints = (words[:, 3] & np.uint32(mask)).tolist()
+        slots = slots.tolist()
+        table = [0] * capacity
+        for key_index, slot in reversed(order):
+            a, b, c = slots[key_index]
+            table[slot] = fingerprints[key_index] ^ table[a] ^ table[b] ^ table[c]
+        xf.fingerprints.set_all(table)
+        return xf
+
+    @staticmethod
+    def _peel(slots, capacity):
+        """Return [(key index, slot)] in peeling order, or None if the hypergraph has a cycle."""
+        n = len(slots)
+        counts = np.bincount(slots.ravel(), minlength=capacity).tolist()
+        # xor of the indexes of the keys hashing to each slot: the only one left once counts[slot] == 1
+        xors = np.zeros(capacity, dtype=np.int64)
+        np.bitwise_xor.at(xors, slots.ravel(), np.repeat(np.arange(n, dtype=np.int64), 3))
+        xors = xors.tolist()
+        slots = slots.tolist()
+
+        order = []
+        queue = [slot for slot in range(capacity) if counts[slot] == 1]
+        while queue:
+            slot = queue.pop()
+            if counts[slot] != 1:
+                continue
+            key_index = xors[slot]
+            order.append((key_index, slot))
+            for other in slots[key_index]:
+                counts[other] -= 1
+                xors[other] ^= key_index
+                if counts[other] == 1:
+                    queue.append(other)
+        return order if len(order) == n else None
+
+    def _words_many(self, items):
+        data = b"".join(mmh3.hash_bytes(str(item).encode(), self.seed) for item in items)
+        return np.frombuffer(data, dtype=np.uint32).reshape(-1, 4)
+
+    def _slots(self, words):
+        segment = np.uint32(self.segment_length)
+        offsets = np.arange(3, dtype=np.int64) * self.segment_length
+        return (words[:, :3] % segment).astype(np.int64) + offsets
+
+    def check(self, item):
+        """Check if an item is possibly in the filter and return its three slots."""
+        w0, w1, w2, w3 = _hash_words(item, self.seed)
+        slots = [w0 % self.segment_length,
+                 self.segment_length + w1 % self.segment_length,
+                 2 * self.segment_length + w2 % self.segment_length]
+        value = self.fingerprints.get(slots[0]) ^ self.fingerprints.get(slots[1]) ^ self.fingerprints.get(slots[2])
+        return value == w3 & self.fingerprints.mask, slots
+
+    def check_many(self, items):
+        """Return a boolean array, True where the item is possibly in the filter."""
+        words = self._words_many(items)
+        values = self.fingerprints.get_many(self._slots(words))
+        combined = values[:, 0] ^ values[:, 1] ^ values[:, 2]
+        return combined == (words[:, 3] & np.uint32(self.fingerprints.mask)).astype(np.uint64)
+
+    def memory_bytes(self):
+        return self.fingerprints.memory_bytes()
+
+    def to_bytes(self):
+        return XOR_HEADER.pack(self.segment_length, self.fingerprint_bits, self.seed) + bytes(self.fingerprints.buf)
+
+    @classmethod
+    def from_bytes(cls, buf):
+        segment_length, fingerprint_bits, seed = XOR_HEADER.unpack_from(buf, 0)
+        xf = cls.__new__(cls)
+        xf.segment_length = segment_length
+        xf.fingerprint_bits = fingerprint_bits
+        xf.seed = seed
+        xf.fingerprints = PackedArray(3 * segment_length, fingerprint_bits, buf[XOR_HEADER.size:])
+        return xf
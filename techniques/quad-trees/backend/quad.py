@@ -1,7 +1,37 @@
-from typing import List, Optional
+import gc
+import heapq
+import itertools
+import math
+from array import array
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Deepest level bulk_load() subdivides to. Two bits per level keep Z-order keys in a uint64;
+# on a whole-globe tree a level-24 cell is about 2 cm wide.
+MAX_DEPTH = 24
+
+# Buckets with at least this many points are tested against a query range with NumPy.
+VECTORIZE_AT = 32
+
+# Mean Earth radius in meters, used for great-circle distances.
+EARTH_RADIUS_M = 6371008.8
+
+def haversine(lon1, lat1, lon2, lat2):
+    """
+    Great-circle distance between two (longitude, latitude) positions given in degrees.
+
+    Returns:
+        float: The distance in meters.
+    """
+    lon1, lat1, lon2, lat2 = map(math.radians, (lon1, lat1, lon2, lat2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
 
 # Represents a single point in 2D space, typically used for geographical coordinates.
 class Point:
+    __slots__ = ("x", "y", "label")
+
     def __init__(self, longitude, latitude, label=None):
         """
         Initializes a Point object.
@@ -33,6 +63,8 @@ class Point:
         
 # Represents a rectangular boundary in 2D space, defined by its center and half-dimensions.
 class Rectangle:
+    __slots__ = ("x", "y", "w", "h")
+
     def __init__(self, x, y, w, h):
         """
         Initializes a Rectangle object.
@@ -75,28 +107,98 @@ class Rectangle:
         return not (range.x - range.w > self.x + self.w or
                     range.x + range.w < self.x - self.w or
                     range.y - range.h > self.y + self.h or
-                    range.y - range.h < self.y - self.h)
+                    range.y + range.h < self.y - self.h)
+
+    def min_distance(self, point):
+        """
+        Lower bound on the great-circle distance from a point to anywhere in this rectangle,
+        treating x as longitude and y as latitude in degrees.
+
+        Inside the rectangle's longitude span the nearest position is straight north or south.
+        Otherwise it lies on the nearer of the two meridian edges (longitudes wrap around at
+        180 degrees), and along a meridian the distance has a single minimum: where the great
+        circle through the point meets the meridian at a right angle. That latitude is used
+        when it falls on the edge; otherwise the nearer end of the edge is.
+
+        Args:
+            point (Point): The point to measure from.
+
+        Returns:
+            float: The distance in meters; 0 if the point is inside the rectangle.
+        """
+        lat_min, lat_max = self.y - self.h, self.y + self.h
+        west, east = self.x - self.w, self.x + self.w
+        # Degrees east of each edge the point is, taken into [0, 360)
+        past_west = (point.x - west) % 360
+        if past_west <= east - west:
+            if point.y < lat_min:
+                return math.radians(lat_min - point.y) * EARTH_RADIUS_M
+            if point.y > lat_max:
+                return math.radians(point.y - lat_max) * EARTH_RADIUS_M
+            return 0.0
+        edge = east if (point.x - east) % 360 <= 360 - past_west else west
+        d_lon = math.radians(point.x - edge)
+        lat = math.radians(point.y)
+        foot = math.degrees(math.atan2(math.sin(lat), math.cos(lat) * math.cos(d_lon)))
+        candidates = [lat_min, lat_max]
+        if lat_min < foot < lat_max:
+            candidates.append(foot)
+        return min(haversine(point.x, point.y, edge, c) for c in candidates)
 
 # Implements a QuadTree data structure for efficient spatial partitioning of points.
 class QuadTree:
+    __slots__ = ("boundary", "capacity", "bucket", "divided",
+                 "northeast", "northwest", "southeast", "southwest")
+
     def __init__(self, boundary: Rectangle, capacity: int):
         """
         Initializes a QuadTree node.
 
+        Points are not kept as Point objects: a node's bucket pairs their coordinates, flat in
+        one array of doubles, with a list of their labels. The bucket is created only once the
+        node holds a point (after a bulk load, internal nodes never do). Point objects are only
+        created for results.
+
+        Readers don't lock: they take the bucket tuple once, insert() appends coordinates
+        before the label (so counting labels never reaches a half-added point), and delete()
+        publishes a new bucket rather than shifting the old one under a reader.
+
         Args:
             boundary (Rectangle): The rectangular area this QuadTree node covers.
             capacity (int): The maximum number of points this node can hold before subdividing.
         """
         self.boundary: Rectangle = boundary
         self.capacity: int = capacity
-        self.points: List[Point] = []  # List of points directly within this node
+        # Points directly within this node: (array of x0, y0, x1, y1, ..., list of their labels)
+        self.bucket: Optional[Tuple[array, List[Optional[str]]]] = None
         self.divided: bool = False     # True if this node has been subdivided
         # Child QuadTree nodes for the four quadrants
         self.northeast: Optional['QuadTree'] = None
         self.northwest: Optional['QuadTree'] = None
         self.southeast: Optional['QuadTree'] = None
         self.southwest: Optional['QuadTree'] = None
-        
+
+    @property
+    def points(self) -> List[Point]:
+        """
+        The points stored directly in this node, as Point objects.
+        """
+        bucket = self.bucket
+        if not bucket:
+            return []
+        coords, labels = bucket
+        return [Point(coords[2 * i], coords[2 * i + 1], label) for i, label in enumerate(labels)]
+
+    def _count(self):
+        """
+        Returns the number of points stored directly in this node.
+        """
+        bucket = self.bucket
+        return len(bucket[1]) if bucket else 0
+
+    def _children(self):
+        return (self.northeast, self.northwest, self.southeast, self.southwest)
+
     def subdivide(self):
         """
         Divides this QuadTree node into four smaller QuadTree nodes (quadrants).
@@ -106,14 +208,14 @@ class QuadTree:
         y = self.boundary.y
         w = self.boundary.w / 2
         h = self.boundary.h / 2
-        
+
         # Create new Rectangles for each quadrant
         self.northeast = QuadTree(Rectangle(x + w, y - h, w, h), self.capacity)
         self.northwest = QuadTree(Rectangle(x - w, y - h, w, h), self.capacity)
         self.southeast = QuadTree(Rectangle(x + w, y + h, w, h), self.capacity)
         self.southwest = QuadTree(Rectangle(x - w, y + h, w, h), self.capacity)
         self.divided = True
-        
+
     def insert(self, point):
         """
         Inserts a point into the QuadTree.
@@ -127,16 +229,21 @@ class QuadTree:
         # If the point is not within this QuadTree's boundary, it cannot be inserted here.
         if not self.boundary.contains(point):
             return False
-        
+
         # If this node has capacity, add the point directly.
-        if len(self.points) < self.capacity:
-            self.points.append(point)
+        if self._count() < self.capacity:
+            if self.bucket is None:
+                self.bucket = (array("d"), [])
+            coords, labels = self.bucket
+            coords.append(point.x)
+            coords.append(point.y)
+            labels.append(point.label)
             return True
         else:
             # If capacity is exceeded, subdivide if not already divided.
             if not self.divided:
                 self.subdivide()
-            
+
             # Attempt to insert the point into one of the child quadrants.
             # The point will only fit into one child's boundary.
             if self.northeast and self.northeast.insert(point):
@@ -148,7 +255,195 @@ class QuadTree:
             if self.southwest and self.southwest.insert(point):
                 return True
         return False # Should not be reached if point is within boundary and tree is correctly structured
-        
+
+    def bulk_load(self, points: Iterable[Point]):
+        """
+        Inserts many points at once, much faster than calling insert() for each.
+        See bulk_load_arrays(), which skips creating Point objects altogether.
+
+        Args:
+            points (Iterable[Point]): The points to insert.
+
+        Returns:
+            int: The number of points inserted. Points outside the boundary are skipped.
+        """
+        points = list(points)
+        return self.bulk_load_arrays([p.x for p in points], [p.y for p in points], [p.label for p in points])
+
+    def bulk_load_arrays(self, longitudes, latitudes, labels=None):
+        """
+        Inserts many points given as parallel sequences of coordinates and labels. The tree is
+        rebuilt with rebuilt_with() and then takes over the new nodes, so readers running at
+        the same time may see a mix of both; use rebuilt_with() directly and swap references
+        to publish the new tree in one step.
+
+        Args:
+            longitudes (Sequence[float]): The x-coordinates of the points.
+            latitudes (Sequence[float]): The y-coordinates of the points.
+            labels (Sequence[str], optional): A label (or None) per point.
+
+        Returns:
+            int: The number of points inserted. Points outside the boundary are skipped.
+        """
+        tree, inserted = self.rebuilt_with(longitudes, latitudes, labels)
+        self.bucket = tree.bucket
+        self.northeast, self.northwest = tree.northeast, tree.northwest
+        self.southeast, self.southwest = tree.southeast, tree.southwest
+        self.divided = tree.divided
+        return inserted
+
+    def rebuilt_with(self, longitudes, latitudes, labels=None) -> Tuple['QuadTree', int]:
+        """
+        Builds a new QuadTree with the same boundary and capacity, holding every point of this
+        tree plus the given ones. This tree is left untouched.
+
+        Every point (including any already in the tree) gets a Z-order (Morton) key: two bits
+        per level naming the quadrant it falls in, computed with the same arithmetic as
+        subdivide() and the same tie-breaking as insert(). After one sort, the points of any
+        node form a contiguous run of keys, so the tree is rebuilt top-down in a single pass,
+        splitting each run only while it holds more than `capacity` points. Points end up in
+        the leaves; a leaf at MAX_DEPTH may hold more than `capacity` (e.g. duplicates).
+
+        Args:
+            longitudes (Sequence[float]): The x-coordinates of the points.
+            latitudes (Sequence[float]): The y-coordinates of the points.
+            labels (Sequence[str], optional): A label (or None) per point.
+
+        Returns:
+            Tuple[QuadTree, int]: The new tree, and the number of the given points it took in.
+            Points outside the boundary are skipped.
+        """
+        xs = np.asarray(longitudes, dtype=np.float64)
+        ys = np.asarray(latitudes, dtype=np.float64)
+        labels = [None] * len(xs) if labels is None else list(labels)
+        if not len(xs) == len(ys) == len(labels):
+            raise ValueError("longitudes, latitudes and labels must have the same length")
+        # Building allocates a node object per cell; the cyclic garbage collector would rescan
+        # every live object many times over while that happens (the tree itself has no cycles)
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            old_xs, old_ys, old_labels = self._columns()
+            tree = QuadTree(self.boundary, self.capacity)
+            inserted = tree._bulk_load(np.concatenate([old_xs, xs]), np.concatenate([old_ys, ys]), old_labels + labels)
+            return tree, inserted - len(old_labels)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    def _bulk_load(self, xs, ys, labels):
+        """
+        Fills this empty node with the given points. See rebuilt_with().
+
+        Returns:
+            int: The number of points within the boundary, all of which were stored.
+        """
+        b = self.boundary
+        inside = (b.x - b.w <= xs) & (xs <= b.x + b.w) & (b.y - b.h <= ys) & (ys <= b.y + b.h)
+        xs, ys = xs[inside], ys[inside]
+        if not inside.all():
+            labels = [label for label, keep in zip(labels, inside.tolist()) if keep]
+
+        # Walk every point down MAX_DEPTH levels at once, tracking the center of the cell it is in
+        keys = np.zeros(len(xs), dtype=np.uint64)
+        cx = np.full(len(xs), b.x, dtype=np.float64)
+        cy = np.full(len(xs), b.y, dtype=np.float64)
+        east = np.empty(len(xs), dtype=bool)
+        south = np.empty(len(xs), dtype=bool)
+        w, h = b.w, b.h
+        for _ in range(MAX_DEPTH):
+            w /= 2
+            h /= 2
+            # insert() tries northeast, northwest, southeast, southwest: quadrants 0 to 3
+            np.greater_equal(xs, cx, out=east)
+            np.greater(ys, cy, out=south)
+            keys <<= np.uint64(2)
+            keys |= south.astype(np.uint64) << np.uint64(1)
+            keys |= ~east
+            cx += np.where(east, w, -w)
+            cy += np.where(south, h, -h)
+
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        # Each leaf copies its run straight out of these, coordinates interleaved
+        coords = array("d", np.column_stack([xs[order], ys[order]]).tobytes())
+        labels = np.array(labels, dtype=object)[order].tolist()
+
+        # Build one level at a time: nodes holding a run of more than `capacity` points are split,
+        # and the runs of all their children are found with a single searchsorted per level
+        level = [self]
+        los, his = np.array([0]), np.array([len(keys)])
+        for depth in range(MAX_DEPTH + 1):
+            split = his - los > self.capacity
+            if depth == MAX_DEPTH:
+                split[:] = False
+            for i, lo, hi in zip(np.flatnonzero(~split).tolist(), los[~split].tolist(), his[~split].tolist()):
+                if lo < hi:
+                    node = level[i]
+                    node.bucket = (coords[2 * lo:2 * hi], labels[lo:hi])
+            if not split.any():
+                break
+            parents = [level[i] for i in np.flatnonzero(split).tolist()]
+            los, his = los[split], his[split]
+            # Children's runs start where the quadrant bits at this depth step to 1, 2 and 3
+            shift = np.uint64(2 * (MAX_DEPTH - depth - 1))
+            prefixes = (keys[los] >> (shift + np.uint64(2))) << (shift + np.uint64(2))
+            starts = np.searchsorted(keys, prefixes[:, None] | (np.arange(4, dtype=np.uint64) << shift))
+            starts[:, 0] = los
+            ends = np.concatenate([starts[:, 1:], his[:, None]], axis=1)
+            level = []
+            for node in parents:
+                node.subdivide()
+                level.extend(node._children())
+            los, his = starts.ravel(), ends.ravel()
+
+        return len(keys)
+
+    def _nodes(self):
+        """
+        Yields this node and all of its descendants.
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            if node.divided:
+                stack.extend(child for child in node._children() if child)
+
+    def _columns(self):
+        """
+        Returns the longitudes and latitudes of every point in the tree as NumPy arrays,
+        and their labels as a list.
+        """
+        buckets = [node.bucket for node in self._nodes() if node.bucket]
+        coords = np.frombuffer(b"".join(coords.tobytes() for coords, _ in buckets), dtype=np.float64)
+        return coords[0::2], coords[1::2], [label for _, labels in buckets for label in labels]
+
+    def all_points(self) -> List[Point]:
+        """
+        Collects every point stored in the QuadTree.
+
+        Returns:
+            List[Point]: All points in this node and its descendants.
+        """
+        return [p for node in self._nodes() for p in node.points]
+
+    def _indexes_in(self, coords, count, area: Rectangle):
+        """
+        Returns the positions of the first `count` points of a bucket's coordinates that lie
+        within a rectangle. Large buckets are tested with NumPy in one pass; small ones in a
+        plain loop, which is cheaper than setting up the arrays.
+        """
+        left, right = area.x - area.w, area.x + area.w
+        bottom, top = area.y - area.h, area.y + area.h
+        if count >= VECTORIZE_AT:
+            # np.array copies, so no buffer export blocks a concurrent append to the array
+            coords = np.array(coords[:2 * count], dtype=np.float64)
+            xs, ys = coords[0::2], coords[1::2]
+            return np.flatnonzero((left <= xs) & (xs <= right) & (bottom <= ys) & (ys <= top)).tolist()
+        return [i for i in range(count)
+                if left <= coords[2 * i] <= right and bottom <= coords[2 * i + 1] <= top]
+
     def query(self, range: Rectangle, found: List[Point]):
         """
         Finds all points within a given rectangular range.
@@ -161,11 +456,18 @@ class QuadTree:
         if not self.boundary.intersects(range):
             return
         else:
-            # Check points directly in this node.
-            for p in self.points:
-                if range.contains(p):
-                    found.append(p)
-            
+            # Check points directly in this node; all of them match if the range covers the node.
+            bucket = self.bucket
+            if bucket and bucket[1]:
+                coords, labels = bucket
+                b = self.boundary
+                if (range.x - range.w <= b.x - b.w and b.x + b.w <= range.x + range.w and
+                        range.y - range.h <= b.y - b.h and b.y + b.h <= range.y + range.h):
+                    found.extend(Point(coords[2 * i], coords[2 * i + 1], label) for i, label in enumerate(labels))
+                else:
+                    found.extend(Point(coords[2 * i], coords[2 * i + 1], labels[i])
+                                 for i in self._indexes_in(coords, len(labels), range))
+
             # If this node is subdivided, recursively query its children.
             if self.divided:
                 if self.northwest:
@@ -177,6 +479,74 @@ class QuadTree:
                 if self.southeast:
                     self.southeast.query(range, found)
 
+    def nearest(self, point: Point, k: int = 1) -> List[Tuple[float, Point]]:
+        """
+        Finds the k points closest to a given point by great-circle distance.
+
+        Best-first search: nodes and points share a priority queue ordered by distance, where
+        a node's priority is the least distance anything inside its boundary could have. A
+        node is only opened when it comes off the queue ahead of every point found so far, so
+        nodes that cannot hold one of the k nearest points are never visited.
+
+        Args:
+            point (Point): The point to search around (longitude, latitude).
+            k (int): The number of points to return.
+
+        Returns:
+            List[Tuple[float, Point]]: Up to k (distance in meters, point) pairs, closest first.
+        """
+        found = []
+        order = itertools.count()  # breaks distance ties without comparing nodes or points
+        queue = [(self.boundary.min_distance(point), next(order), self)]
+        while queue and len(found) < k:
+            distance, _, item = heapq.heappop(queue)
+            if not isinstance(item, QuadTree):
+                found.append((distance, Point(*item)))
+                continue
+            if item.bucket:
+                coords, labels = item.bucket
+                for i, label in enumerate(labels):
+                    x, y = coords[2 * i], coords[2 * i + 1]
+                    heapq.heappush(queue, (haversine(point.x, point.y, x, y), next(order), (x, y, label)))
+            if item.divided:
+                for child in item._children():
+                    if child:
+                        heapq.heappush(queue, (child.boundary.min_distance(point), next(order), child))
+        return found
+
+    def within_radius(self, point: Point, meters: float) -> List[Tuple[float, Point]]:
+        """
+        Finds all points within a great-circle distance of a given point.
+
+        Only nodes whose boundary comes within `meters` of the point are visited, which
+        accounts for meridians converging toward the poles (a degree of longitude spans
+        cos(latitude) times the distance of a degree of latitude).
+
+        Args:
+            point (Point): The center of the search (longitude, latitude).
+            meters (float): The search radius in meters.
+
+        Returns:
+            List[Tuple[float, Point]]: (distance in meters, point) pairs, closest first.
+        """
+        found = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.boundary.min_distance(point) > meters:
+                continue
+            if node.bucket:
+                coords, labels = node.bucket
+                for i, label in enumerate(labels):
+                    x, y = coords[2 * i], coords[2 * i + 1]
+                    distance = haversine(point.x, point.y, x, y)
+                    if distance <= meters:
+                        found.append((distance, Point(x, y, label)))
+            if node.divided:
+                stack.extend(child for child in node._children() if child)
+        found.sort(key=lambda pair: pair[0])
+        return found
+
     def delete(self, point):
         """
         Deletes a specific point from the QuadTree.
@@ -195,19 +565,25 @@ class QuadTree:
 
         # Check if the point exists in this node's points, considering label if provided.
         found_in_this_node = False
-        for i, p in enumerate(self.points):
-            if p.x == point.x and p.y == point.y:
+        coords, labels = self.bucket or (array("d"), [])
+        for i in range(len(labels)):
+            if coords[2 * i] == point.x and coords[2 * i + 1] == point.y:
                 # If a label is provided in the point to delete, it must match.
                 # Otherwise, if no label is provided, just match by coordinates.
-                if point.label is None or p.label == point.label:
-                    self.points.pop(i) # Remove the point
+                if point.label is None or labels[i] == point.label:
+                    # Remove the point. Readers may still hold the old bucket, so build a new
+                    # one and publish it in a single assignment instead of shifting this one.
+                    if len(labels) == 1:
+                        self.bucket = None
+                    else:
+                        self.bucket = (coords[:2 * i] + coords[2 * i + 2:], labels[:i] + labels[i + 1:])
                     found_in_this_node = True
                     break
-        
+
         if found_in_this_node:
             # If this node is now empty and its children are also empty, collapse them
             # to maintain an efficient tree structure.
-            if not self.points and self.divided and self._are_children_empty():
+            if not self.bucket and self.divided and self._are_children_empty():
                 self._collapse_children()
             return True
         elif self.divided:
@@ -234,14 +610,12 @@ class QuadTree:
         Returns:
             bool: True if all children are empty, False otherwise.
         """
-        children = [self.northeast, self.northwest, self.southeast, self.southwest]
-        for child in children:
+        for child in self._children():
             # A child is not empty if it exists AND (it's divided OR it contains points)
-            if child is not None and (child.divided or child.points):
+            if child is not None and (child.divided or child.bucket):
                 return False
         return True
 
-
     def _collapse_children(self):
         """
         Helper method to collapse (remove) child quadrants.
@@ -259,7 +633,7 @@ class QuadTree:
         Helper method to check if a node's children can be collapsed after a deletion.
         This ensures the tree remains optimized.
         """
-        if not self.points and self.divided and self._are_children_empty():
+        if not self.bucket and self.divided and self._are_children_empty():
             self._collapse_children()
 
     def to_dict(self):
@@ -287,4 +661,4 @@ class QuadTree:
                 "southeast": self.southeast.to_dict() if self.southeast else None,
                 "southwest": self.southwest.to_dict() if self.southwest else None,
             }
-        return node_data
\ No newline at end of file
+        return node_data
@@ -1,5 +1,9 @@
+import json
+import os
+import threading
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 from fastapi.middleware.cors import CORSMiddleware
@@ -22,6 +26,19 @@ class RectangleModel(BaseModel):
     w: float
     h: float
 
+class NearestModel(BaseModel):
+    longitude: float
+    latitude: float
+    k: int = 10  # Number of closest points to return
+
+class RadiusModel(BaseModel):
+    longitude: float
+    latitude: float
+    meters: float  # Great-circle search radius
+
+class PointDistanceModel(PointModel):
+    distance_m: float  # Great-circle distance from the query point in meters
+
 # New Pydantic models for visualization
 class BoundaryModel(BaseModel):
     x: float
@@ -55,10 +72,67 @@ app.add_middleware(
 # Define a boundary for our QuadTree.
 # Example: A boundary roughly covering a large city area.
 world_boundary = Rectangle(0, 0, 180, 90) # Covers the entire globe
-# The capacity of each node in the tree.
-CAPACITY = 4
+# The capacity of each node in the tree. Larger buckets make for fewer nodes and less
+# memory per point; see "Point Storage" in the README.
+CAPACITY = int(os.environ.get("QUADTREE_CAPACITY", 4))
 # Initialize the QuadTree. This will act as our in-memory database.
 quad_tree = QuadTree(world_boundary, CAPACITY)
+# Number of points in quad_tree, maintained by the endpoints that change it.
+point_count = 0
+# Updates take this lock so a bulk rebuild cannot lose a concurrent insert or delete.
+# Readers don't: a bulk load builds a new tree and then replaces quad_tree in one assignment.
+tree_lock = threading.Lock()
+# Bulk loads smaller than this fraction of the tree are inserted point by point; rebuilding
+# costs time proportional to the whole tree, so it only pays off for large batches.
+REBUILD_FRACTION = 0.2
+
+
+# --- Helpers ---
+
+def parse_point(line, line_number):
+    """Parses one NDJSON line of the bulk endpoint into a (longitude, latitude, label) tuple."""
+    try:
+        data = json.loads(line)
+        label = data.get("label")
+        return float(data["longitude"]), float(data["latitude"]), None if label is None else str(label)
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail=f"Invalid point on line {line_number}.")
+
+async def read_points(request: Request):
+    """
+    Reads a streamed NDJSON body of point objects, one per line, as it arrives. Returns the
+    longitudes, latitudes and labels as separate lists, ready for QuadTree.bulk_load_arrays().
+    """
+    longitudes, latitudes, labels = [], [], []
+    buffer = b""
+    line_number = 0
+
+    def add(line, line_number):
+        longitude, latitude, label = parse_point(line, line_number)
+        longitudes.append(longitude)
+        latitudes.append(latitude)
+        labels.append(label)
+
+    async for data in request.stream():
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                add(line, line_number)
+    if buffer.strip():
+        add(buffer, line_number + 1)
+    return longitudes, latitudes, labels
+
+def bulk_insert(longitudes, latitudes, labels):
+    global quad_tree, point_count
+    with tree_lock:
+        if len(longitudes) < REBUILD_FRACTION * point_count:
+            inserted = sum(quad_tree.insert(Point(x, y, label)) for x, y, label in zip(longitudes, latitudes, labels))
+        else:
+            quad_tree, inserted = quad_tree.rebuilt_with(longitudes, latitudes, labels)
+        point_count += inserted
+        return inserted
 
 
 # --- API Endpoints ---
@@ -68,14 +142,28 @@ def insert_point(point: PointModel):
     """
     Inserts a new geographical point into the QuadTree.
     """
+    global point_count
     p = Point(point.longitude, point.latitude, point.label) # Pass label to Point constructor
-    if not quad_tree.insert(p):
+    with tree_lock:
+        inserted = quad_tree.insert(p)
+        point_count += inserted
+    if not inserted:
         raise HTTPException(
             status_code=400,
             detail="Point is outside the boundary of the QuadTree."
         )
     return point
 
+@app.post("/points/bulk", status_code=201, tags=["Points"])
+async def insert_points(request: Request):
+    """
+    Inserts every point of a streamed NDJSON body, one {"longitude", "latitude", "label"} object
+    per line, building the tree in one pass. Nothing is inserted if any line is invalid.
+    """
+    longitudes, latitudes, labels = await read_points(request)
+    inserted = await run_in_threadpool(bulk_insert, longitudes, latitudes, labels)
+    return {"inserted": inserted, "outside_boundary": len(longitudes) - inserted}
+
 @app.post("/points/search/", response_model=List[PointModel], tags=["Points"])
 def search_points(range_rect: RectangleModel):
     """
@@ -87,13 +175,37 @@ def search_points(range_rect: RectangleModel):
     # Convert internal Point objects to Pydantic models for the response
     return [{"longitude": p.x, "latitude": p.y, "label": p.label} for p in found_points] # Include label
 
+@app.post("/points/nearest/", response_model=List[PointDistanceModel], tags=["Points"])
+def nearest_points(query: NearestModel):
+    """
+    Finds the k points closest to a position by great-circle distance, closest first.
+    """
+    if query.k < 1:
+        raise HTTPException(status_code=400, detail="k must be at least 1.")
+    found = quad_tree.nearest(Point(query.longitude, query.latitude), query.k)
+    return [{"longitude": p.x, "latitude": p.y, "label": p.label, "distance_m": d} for d, p in found]
+
+@app.post("/points/within/", response_model=List[PointDistanceModel], tags=["Points"])
+def points_within_radius(query: RadiusModel):
+    """
+    Finds all points within a great-circle radius (in meters) of a position, closest first.
+    """
+    if query.meters < 0:
+        raise HTTPException(status_code=400, detail="meters must not be negative.")
+    found = quad_tree.within_radius(Point(query.longitude, query.latitude), query.meters)
+    return [{"longitude": p.x, "latitude": p.y, "label": p.label, "distance_m": d} for d, p in found]
+
 @app.delete("/points/", status_code=200, tags=["Points"])
 def delete_point(point: PointModel):
     """
     Deletes a geographical point from the QuadTree.
     """
+    global point_count
     p = Point(point.longitude, point.latitude, point.label) # Pass label to Point constructor
-    if not quad_tree.delete(p):
+    with tree_lock:
+        deleted = quad_tree.delete(p)
+        point_count -= deleted
+    if not deleted:
         raise HTTPException(
             status_code=404,
             detail="Point not found in the QuadTree."